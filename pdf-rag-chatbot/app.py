@@ -3,26 +3,67 @@ FastAPI 기반 웹 챗봇 API 서버
 LlamaIndex + ChromaDB + Ollama를 활용한 PDF 기반 RAG 챗봇
 """
 import os
-import uuid
+import sys
+import asyncio
+import threading
+import logging
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException, Query, Request
+import anyio
+import orjson
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from rag_chatbot_ollama import RAGChatbot
-from database import db
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from rag_chatbot_ollama import RAGChatbot, ChatbotError
+from database import db, DBError
+from semantic_cache import SemanticCache
+from embed_batcher import EmbedBatcher
 import uvicorn
 
+# 로깅 설정 (print 대신 사용, 한 번만 설정)
+# - 요청 처리 경로에서는 큐에 넣기만 하고, 실제 출력은 QueueListener 백그라운드 스레드가 담당
+# - LOG_LEVEL=DEBUG로 요청 데이터 디버그 로그 확인 가능
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue, _log_stream_handler)
+log_listener.start()
+_log_queue_handler = logging.handlers.QueueHandler(log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # 시간/레벨은 리스너 쪽에서 한 번만 붙임
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    handlers=[_log_queue_handler]
+)
+logger = logging.getLogger("rag")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    서버 수명 주기 관리
+    - 여러 워커로 실행하면 워커 프로세스마다 한 번씩 챗봇/DB 연결을 초기화
+    """
+    await startup_event()
+    yield
+    await shutdown_event()
+
+
 # FastAPI 앱 생성
 app = FastAPI(
+    lifespan=lifespan,
     title="PDF RAG 챗봇 API",
     version="1.0.0",
     description="LlamaIndex + ChromaDB + Ollama를 활용한 PDF 기반 RAG 챗봇 API",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse  # 한글이 많은 긴 답변도 빠르게 직렬화
 )
 
 # 정적 파일 서빙 (HTML 파일)
@@ -32,27 +73,52 @@ except Exception:
     pass  # static 디렉토리가 없어도 API는 작동
 
 # CORS 설정 (프론트엔드에서 API 호출을 위해 필요)
+# - credentials 허용 시 와일드카드 origin은 사용할 수 없으므로 허용 도메인을 명시 (쉼표로 구분)
+# - preflight(OPTIONS) 결과를 브라우저가 하루 동안 캐시하도록 max_age 설정
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # 프로덕션에서는 특정 도메인만 허용하세요
+    allow_origins=[
+        origin.strip()
+        for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
+        if origin.strip()
+    ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,
 )
 
+# 압축하지 않을 경로 (SSE 스트림은 압축 버퍼링 없이 토큰 단위로 바로 전송해야 함)
+NO_GZIP_PATHS = {"/api/chat/stream"}
+
+
+class StreamSafeGZipMiddleware(GZipMiddleware):
+    """SSE 스트림 경로는 압축하지 않는 GZip 미들웨어
+    (text/event-stream 자동 제외는 최신 Starlette에만 있으므로 경로로 직접 제외)"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in NO_GZIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# 응답 압축 (긴 한국어 답변/채팅 기록의 전송량 감소, 1KB 미만 응답과 SSE 스트림은 압축하지 않음)
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # ValidationError 처리 (422 오류 상세 정보 표시)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """422 오류 발생 시 상세 정보 반환"""
-    errors = exc.errors()
-    error_details = []
-    for error in errors:
-        error_details.append({
-            "field": ".".join(str(loc) for loc in error["loc"]),
+    error_details = [
+        {
+            "field": ".".join(map(str, error["loc"])),
             "message": error["msg"],
             "type": error["type"]
-        })
-    return JSONResponse(
+        }
+        for error in exc.errors()
+    ]
+    return ORJSONResponse(
         status_code=422,
         content={
             "success": False,
@@ -62,9 +128,45 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
+
+# 처리하지 않은 예외 (프로그래밍 오류 등)도 같은 에러 응답 형식으로 반환
+# (트레이스는 Starlette가 예외를 다시 올려 서버 로그에 남김)
+INTERNAL_ERROR_CONTENT = {
+    "success": False,
+    "message": "서버 내부 오류가 발생했습니다.",
+    "error": "InternalServerError",
+    "detail": None
+}
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """500 오류 발생 시 공통 에러 응답 반환"""
+    return ORJSONResponse(status_code=500, content=INTERNAL_ERROR_CONTENT)
+
 # 전역 챗봇 인스턴스 (서버 시작 시 한 번만 초기화)
 chatbot: Optional[RAGChatbot] = None
 
+# 챗봇 초기화 잠금 (모델/인덱스가 동시에 두 번 로드되지 않도록 함)
+chatbot_init_lock = asyncio.Lock()
+
+# 시맨틱 응답 캐시 (의미가 비슷한 반복 질문은 LLM 호출 없이 응답)
+semantic_cache: Optional[SemanticCache] = None
+
+# 동시에 들어온 질문의 임베딩을 모아서 한 번에 계산하는 배처
+embed_batcher: Optional[EmbedBatcher] = None
+
+# /api/query 완전 일치 캐시: (question, similarity_top_k) -> answer
+query_cache: TTLCache = TTLCache(
+    maxsize=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl=int(os.getenv("QUERY_CACHE_TTL", "3600"))
+)
+query_cache_lock = threading.Lock()
+
+# /api/query 키별 잠금: 같은 질문이 동시에 들어오면 한 요청만 계산하고 나머지는 캐시 결과 사용
+# (key -> [asyncio.Lock, 대기 중인 요청 수], 이벤트 루프 스레드에서만 접근)
+query_key_locks: dict = {}
+
 # 세션 관리는 RAGChatbot 클래스 내부에서 처리
 
 
@@ -82,9 +184,47 @@ class ErrorResponse(BaseResponse):
     detail: Optional[str] = None
 
 
+# 챗봇 미초기화 에러 (고정 응답이므로 모듈 로드 시 한 번만 생성)
+NOT_INITIALIZED_DETAIL = {
+    "success": False,
+    "message": "챗봇이 초기화되지 않았습니다.",
+    "error": "ChatbotNotInitialized",
+    "detail": "/api/init 엔드포인트를 먼저 호출하세요."
+}
+
+
+# 자주 쓰는 고정 에러 응답
+INIT_IN_PROGRESS_DETAIL = {
+    "success": False,
+    "message": "챗봇 초기화가 이미 진행 중입니다.",
+    "error": "InitializationInProgress",
+    "detail": None
+}
+DB_NOT_CONNECTED_DETAIL = {
+    "success": False,
+    "message": "데이터베이스에 연결되지 않았습니다.",
+    "error": "DatabaseNotConnected",
+    "detail": "서버 시작 시 데이터베이스 연결에 실패했습니다. 데이터베이스가 실행 중인지 확인하세요."
+}
+INVALID_USER_ID_DETAIL = {
+    "success": False,
+    "message": "잘못된 사용자 ID 형식입니다.",
+    "error": "InvalidUserId",
+    "detail": "userId는 정수여야 합니다."
+}
+CHAT_NOT_FOUND_DETAIL = {
+    "success": False,
+    "message": "채팅을 찾을 수 없습니다.",
+    "error": "ChatNotFound",
+    "detail": None
+}
+
+
 # ==================== 채팅 관련 모델 ====================
 class ChatRequest(BaseModel):
     """채팅 요청 모델"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     question: str
     session_id: str = "default"
 
@@ -94,10 +234,13 @@ class ChatResponse(BaseResponse):
     success: bool = True
     answer: str
     session_id: str
+    cache_hit: bool = False  # 시맨틱 캐시에서 응답했는지 여부
 
 
 class ChatResetRequest(BaseModel):
     """채팅 세션 초기화 요청"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     session_id: str = "default"
 
 
@@ -110,6 +253,8 @@ class ChatResetResponse(BaseResponse):
 # ==================== 질문 관련 모델 ====================
 class QueryRequest(BaseModel):
     """단일 질문 요청 모델"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     question: str
     similarity_top_k: int = 5
 
@@ -118,11 +263,38 @@ class QueryResponse(BaseResponse):
     """단일 질문 응답 모델"""
     success: bool = True
     answer: str
+    cache_hit: bool = False  # 시맨틱 캐시에서 응답했는지 여부
+
+
+# 배치 질문 최대 개수 (임베딩 배처의 최대 배치 크기와 동일)
+MAX_BATCH_QUESTIONS = 32
+
+
+class BatchQueryRequest(BaseModel):
+    """여러 질문 요청 모델"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    questions: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUESTIONS)
+    similarity_top_k: int = 5
+
+
+class BatchQueryResult(BaseModel):
+    """여러 질문 응답의 개별 결과"""
+    answer: str
+    cache_hit: bool = False  # 캐시에서 응답했는지 여부
+
+
+class BatchQueryResponse(BaseResponse):
+    """여러 질문 응답 모델"""
+    success: bool = True
+    results: List[BatchQueryResult]
 
 
 # ==================== 초기화 관련 모델 ====================
 class InitRequest(BaseModel):
     """챗봇 초기화 요청 모델"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     pdf_directory: str = "pdfs"
     persist_dir: str = "./chroma_db"
     model_name: str = "qwen2.5:1.5b"
@@ -159,9 +331,9 @@ class UserCreateRequest(BaseModel):
     image: Optional[str] = Field(None, description="프로필 이미지 URL")
     provider: Optional[str] = Field(None, description="인증 제공자 (google, etc.)")
     provider_id: Optional[str] = Field(None, description="인증 제공자 ID (google ID, etc.)")
-    class Config:
-        # 필드명을 유연하게 받기 위한 설정
-        populate_by_name = True
+
+    # 필드명을 유연하게 받기 위한 설정
+    model_config = ConfigDict(extra="forbid", frozen=True, populate_by_name=True)
 
 
 class UserResponse(BaseResponse):
@@ -189,20 +361,21 @@ class ChatHistory(BaseModel):
 
 class ChatCreateRequest(BaseModel):
     """채팅 생성 요청 모델"""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     title: str
-    userId: str  # 프론트엔드에서 문자열로 전달되지만, 백엔드에서 INTEGER로 변환
+    userId: int  # 프론트엔드에서 문자열로 전달되어도 Pydantic이 INTEGER로 변환
     messages: List[Message]
 
 
 class ChatUpdateRequest(BaseModel):
     """채팅 업데이트 요청 모델"""
     chatId: str = Field(..., description="채팅 ID")
-    userId: str = Field(..., description="사용자 ID (문자열로 전달되지만 INTEGER로 변환)")
+    userId: int = Field(..., description="사용자 ID (문자열로 전달되어도 INTEGER로 변환)")
     title: str = Field(..., description="채팅 제목")
     messages: List[Message] = Field(..., description="메시지 목록")
-    
-    class Config:
-        populate_by_name = True
+
+    model_config = ConfigDict(extra="forbid", frozen=True, populate_by_name=True)
 
 
 class ChatResponseModel(BaseResponse):
@@ -217,82 +390,154 @@ class ChatListResponse(BaseResponse):
     chats: List[ChatHistory] = []
 
 
-@app.on_event("startup") #서버가 실행될 때 딱 한 번 실행
-async def startup_event():
-    """서버 시작 시 챗봇 및 데이터베이스 자동 초기화"""
-    global chatbot
-    print("=" * 60)
-    print("🚀 서버 시작 중...")
-    print("=" * 60)
-    
-    # 데이터베이스 연결
+async def restart_embed_batcher(embed_model):
+    """새 챗봇의 임베딩 모델로 배처를 (다시) 시작"""
+    global embed_batcher
+    if embed_batcher is not None:
+        await embed_batcher.stop()
+    embed_batcher = EmbedBatcher(embed_model)
+    embed_batcher.start()
+
+
+def warmup_chatbot(bot: RAGChatbot):
+    """
+    첫 요청의 콜드 스타트 비용을 서버 시작 시 미리 처리
+    - Ollama 모델 메모리 로드, 임베딩 모델 첫 실행, ChromaDB 인덱스 로드 등
+    """
+    bot.query("warmup", similarity_top_k=1)
+    bot.chat("warmup", session_id="__warmup__")
+    bot.reset_session("__warmup__")
+
+
+@asynccontextmanager
+async def query_key_lock(key):
+    """같은 키의 질의를 한 번에 하나씩만 처리하도록 하는 키별 잠금"""
+    entry = query_key_locks.get(key)
+    if entry is None:
+        entry = query_key_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del query_key_locks[key]
+
+
+def create_semantic_cache(persist_dir: str) -> SemanticCache:
+    """챗봇 persist_dir에 저장되는 시맨틱 캐시 생성"""
+    return SemanticCache(
+        db_path=os.path.join(persist_dir, "semantic_cache.sqlite3"),
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    )
+
+
+async def connect_database():
+    """데이터베이스 연결 (실패해도 서버 시작은 계속 진행)"""
     try:
-        print("🗄️  데이터베이스 연결 중...")
+        logger.info("🗄️  데이터베이스 연결 중...")
         await db.connect()
-        print("✅ 데이터베이스 연결 완료!")
+        logger.info("✅ 데이터베이스 연결 완료!")
     except Exception as e:
-        print(f"⚠️  데이터베이스 연결 실패: {e}")
-        print("   API는 작동하지만 사용자 및 채팅 기록 기능이 제한됩니다.")
-    
-    # 챗봇 초기화
-    print("=" * 60)
-    print("🤖 챗봇을 자동으로 초기화합니다.")
-    print("=" * 60)
+        logger.warning(
+            "⚠️  데이터베이스 연결 실패: %s (API는 작동하지만 사용자 및 채팅 기록 기능이 제한됩니다.)", e
+        )
+
+
+async def load_chatbot():
+    """서버 시작 시 챗봇 자동 초기화 (실패 시 /api/init으로 수동 초기화 가능)"""
+    global chatbot, semantic_cache
+    logger.info("🤖 챗봇을 자동으로 초기화합니다.")
     try:
-        print("📦 Ollama 모델 로드 중...")
         # 빠른 응답을 위한 작은 모델 사용 (qwen2.5:1.5b 또는 llama3.2:1b)
         model_name = os.getenv("OLLAMA_MODEL", "qwen2.5:1.5b")
-        print(f"📝 사용할 모델: {model_name}")
+        logger.info("📦 Ollama 모델 로드 및 PDF 파일 인덱싱 시작 (모델: %s)", model_name)
+        # 모델 로드/PDF 인덱싱은 오래 걸리므로 스레드풀에서 실행 (이벤트 루프 블로킹 방지)
+        chatbot = await anyio.to_thread.run_sync(lambda: RAGChatbot(model_name=model_name))
+        semantic_cache = create_semantic_cache(chatbot.persist_dir)
+        if chatbot.index_changed:
+            # PDF가 추가/변경/삭제되었으므로 이전 실행에서 저장된 답변은 폐기
+            await anyio.to_thread.run_sync(semantic_cache.clear)
+        await restart_embed_batcher(chatbot.embed_model)
         
-        print("📚 PDF 파일 인덱싱 시작...")
-        chatbot = RAGChatbot(model_name=model_name)
+        # 워밍업 (실패해도 서버 시작은 계속 진행)
+        if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+            try:
+                logger.info("🔥 워밍업 질의 실행 중...")
+                await anyio.to_thread.run_sync(warmup_chatbot, chatbot)
+            except Exception as e:
+                logger.warning("⚠️  워밍업 실패 (무시하고 계속합니다): %s", e)
         
-        print("=" * 60)
-        print("✅ 챗봇 초기화 완료! 서버가 준비되었습니다.")
-        print("=" * 60)
-        print(f"🌐 웹 인터페이스: http://localhost:8000/static/index.html")
-        print(f"📖 API 문서: http://localhost:8000/api/docs")
-        print("=" * 60)
+        port = os.getenv("PORT", "8000")
+        logger.info("✅ 챗봇 초기화 완료! 서버가 준비되었습니다.")
+        logger.info("🌐 웹 인터페이스: http://localhost:%s/static/index.html", port)
+        logger.info("📖 API 문서: http://localhost:%s/api/docs", port)
     except Exception as e:
-        print("=" * 60)
-        print(f"❌ 챗봇 초기화 실패: {e}")
-        print("=" * 60)
-        print("💡 해결 방법:")
-        print("   1. Ollama 서버가 실행 중인지 확인: ollama serve")
-        print("   2. 모델이 다운로드되었는지 확인: ollama list")
-        print("   3. 모델이 없으면 다운로드: ollama pull qwen2.5:1.5b")
-        print("   4. /api/init 엔드포인트를 통해 수동으로 초기화할 수 있습니다.")
-        print("=" * 60)
+        logger.error(
+            "❌ 챗봇 초기화 실패: %s\n"
+            "💡 해결 방법:\n"
+            "   1. Ollama 서버가 실행 중인지 확인: ollama serve\n"
+            "   2. 모델이 다운로드되었는지 확인: ollama list\n"
+            "   3. 모델이 없으면 다운로드: ollama pull qwen2.5:1.5b\n"
+            "   4. /api/init 엔드포인트를 통해 수동으로 초기화할 수 있습니다.",
+            e
+        )
         chatbot = None  # 초기화 실패 시 None으로 설정
+        semantic_cache = None
+
+
+async def startup_event():
+    """서버 시작 시 챗봇 및 데이터베이스 자동 초기화"""
+    if chatbot is not None:
+        # 시작 이벤트가 중복 실행되어도 모델을 다시 로드하지 않음
+        return
+    
+    logger.info("🚀 서버 시작 중...")
+    
+    # 블로킹 RAG 호출을 처리할 스레드풀 크기 설정 (anyio 기본값 40)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "64"))
+    
+    # OpenAPI 스키마는 첫 문서 요청 시 생성되므로 시작 시 미리 생성해 캐시
+    # (요청 모델의 검증기는 Pydantic v2가 클래스 정의 시점에 이미 생성함)
+    app.openapi()
+    
+    # DB 연결과 챗봇 초기화는 서로 독립적이므로 동시에 진행 (콜드 스타트 시간 단축)
+    await asyncio.gather(connect_database(), load_chatbot())
 
 
-@app.on_event("shutdown")
 async def shutdown_event():
-    """서버 종료 시 데이터베이스 연결 종료"""
+    """서버 종료 시 임베딩 배처 및 데이터베이스 연결 종료"""
+    if embed_batcher is not None:
+        await embed_batcher.stop()
     await db.close()
+    log_listener.stop()  # 큐에 남은 로그 출력 후 종료
 
 
-@app.get("/", response_model=StatusResponse)
-async def root():
-    """
-    API 루트 엔드포인트 - 서버 상태 확인
-    """
-    return StatusResponse(
-        status="running",
-        chatbot_initialized=chatbot is not None,
-        message="PDF RAG 챗봇 API"
-    )
+# 상태 응답은 챗봇 초기화 여부에 따라 두 가지뿐이므로 JSON 바이트를 미리 만들어 둠
+HEALTH_READY_BYTES = orjson.dumps(StatusResponse(
+    status="healthy",
+    chatbot_initialized=True,
+    message="서버가 정상적으로 실행 중입니다."
+).model_dump())
+HEALTH_NOT_READY_BYTES = orjson.dumps(StatusResponse(
+    status="healthy",
+    chatbot_initialized=False,
+    message="서버가 정상적으로 실행 중입니다."
+).model_dump())
 
 
+@app.get("/", response_model=StatusResponse)
+@app.get("/health", response_model=StatusResponse, include_in_schema=False)
 @app.get("/api/health", response_model=StatusResponse)
 async def health_check():
     """
-    헬스 체크 엔드포인트
+    서버 상태 확인 / 헬스 체크 엔드포인트
+    - /, /health, /api/health 모두 같은 응답을 반환
     """
-    return StatusResponse(
-        status="healthy",
-        chatbot_initialized=chatbot is not None,
-        message="서버가 정상적으로 실행 중입니다."
+    return Response(
+        content=HEALTH_READY_BYTES if chatbot is not None else HEALTH_NOT_READY_BYTES,
+        media_type="application/json"
     )
 
 
@@ -302,27 +547,86 @@ async def initialize_chatbot(request: InitRequest):
     챗봇 초기화
     - 서버 시작 시 자동 초기화되지만, 수동으로도 가능합니다.
     """
-    global chatbot
-    try:
-        chatbot = RAGChatbot(
-            pdf_directory=request.pdf_directory,
-            persist_dir=request.persist_dir,
-            model_name=request.model_name
+    global chatbot, semantic_cache
+    # 이미 초기화가 진행 중이면 모델/인덱스를 중복으로 로드하지 않도록 거절
+    if chatbot_init_lock.locked():
+        raise HTTPException(
+            status_code=409,
+            detail=INIT_IN_PROGRESS_DETAIL
         )
-        return InitResponse(
-            success=True,
-            message="챗봇 초기화가 완료되었습니다."
+    
+    async with chatbot_init_lock:
+        try:
+            # PDF 인덱싱은 오래 걸리므로 스레드풀에서 실행 (이벤트 루프 블로킹 방지)
+            new_chatbot = await anyio.to_thread.run_sync(
+                RAGChatbot,
+                request.pdf_directory,
+                request.persist_dir,
+                request.model_name
+            )
+            # 인덱스가 새로 만들어졌으므로 이전 답변 캐시는 폐기
+            new_cache = create_semantic_cache(new_chatbot.persist_dir)
+            await anyio.to_thread.run_sync(new_cache.clear)
+            await restart_embed_batcher(new_chatbot.embed_model)
+            chatbot, semantic_cache = new_chatbot, new_cache
+            with query_cache_lock:
+                query_cache.clear()
+            return InitResponse(
+                success=True,
+                message="챗봇 초기화가 완료되었습니다."
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "success": False,
+                    "message": "챗봇 초기화에 실패했습니다.",
+                    "error": "InitializationError",
+                    "detail": str(e)
+                }
+            )
+
+
+async def answer_query(question: str, similarity_top_k: int):
+    """
+    단일 질문 답변 (완전 일치 캐시 → 시맨틱 캐시 → RAG 질의 순서)
+    
+    Returns:
+        (답변, 캐시 히트 여부)
+    """
+    # 같은 질문은 (앞뒤 공백, 대소문자 무시) 임베딩 계산 없이 바로 응답
+    cache_key = (question.strip().lower(), similarity_top_k)
+    with query_cache_lock:
+        cached_answer = query_cache.get(cache_key)
+    if cached_answer is not None:
+        return cached_answer, True
+    
+    async with query_key_lock(cache_key):
+        # 잠금을 기다리는 동안 먼저 들어온 같은 질문이 캐시를 채웠을 수 있음
+        with query_cache_lock:
+            cached_answer = query_cache.get(cache_key)
+        if cached_answer is not None:
+            return cached_answer, True
+        
+        # 질문 임베딩으로 시맨틱 캐시 조회 (단일 질의는 세션 무관, 같은 similarity_top_k의 답변만 사용)
+        # 동시에 들어온 질문들은 배처가 한 번의 임베딩 호출로 묶어서 처리
+        # 조회는 캐시 잠금을 기다리거나 큰 행렬곱을 할 수 있으므로 스레드풀에서 실행
+        question_embedding = await embed_batcher.submit(question)
+        cached_answer = await anyio.to_thread.run_sync(
+            semantic_cache.lookup, question_embedding, None, similarity_top_k
         )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="챗봇 초기화에 실패했습니다.",
-                error="InitializationError",
-                detail=str(e)
-            ).dict()
+        if cached_answer is not None:
+            with query_cache_lock:
+                query_cache[cache_key] = cached_answer
+            return cached_answer, True
+        
+        answer = await anyio.to_thread.run_sync(chatbot.query, question, similarity_top_k)
+        await anyio.to_thread.run_sync(
+            semantic_cache.add, question_embedding, answer, None, similarity_top_k
         )
+        with query_cache_lock:
+            query_cache[cache_key] = answer
+    return answer, False
 
 
 @app.post("/api/query", response_model=QueryResponse)
@@ -332,38 +636,80 @@ async def query_chatbot(request: QueryRequest):
     - 대화 기록을 유지하지 않는 단일 질문/답변입니다.
     """
     if chatbot is None:
-        raise HTTPException(
-            status_code=503,
-            detail=ErrorResponse(
-                success=False,
-                message="챗봇이 초기화되지 않았습니다.",
-                error="ChatbotNotInitialized",
-                detail="/api/init 엔드포인트를 먼저 호출하세요."
-            ).dict()
-        )
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED_DETAIL)
     
     try:
-        answer = chatbot.query(
-            question=request.question,
-            similarity_top_k=request.similarity_top_k
-        )
+        answer, cache_hit = await answer_query(request.question, request.similarity_top_k)
         return QueryResponse(
             success=True,
             answer=answer,
-            message="질문이 성공적으로 처리되었습니다."
+            message="질문이 성공적으로 처리되었습니다.",
+            cache_hit=cache_hit
         )
-    except Exception as e:
+    except ChatbotError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "message": "질문 처리 중 오류가 발생했습니다.",
+                "error": "QueryError",
+                "detail": str(e)
+            }
+        )
+
+
+@app.post("/api/query/batch", response_model=BatchQueryResponse)
+async def query_chatbot_batch(request: BatchQueryRequest):
+    """
+    여러 질문에 대한 답변을 한 번에 생성
+    - 질문 임베딩은 한 번의 배치 호출로 계산되고, 검색/답변 생성은 병렬로 처리됩니다.
+    - 결과는 요청한 질문 순서와 같습니다.
+    """
+    if chatbot is None:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED_DETAIL)
+    
+    try:
+        answers = await asyncio.gather(*[
+            answer_query(question, request.similarity_top_k)
+            for question in request.questions
+        ])
+        return BatchQueryResponse(
+            success=True,
+            message=f"{len(answers)}개의 질문이 성공적으로 처리되었습니다.",
+            results=[
+                BatchQueryResult(answer=answer, cache_hit=cache_hit)
+                for answer, cache_hit in answers
+            ]
+        )
+    except ChatbotError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="질문 처리 중 오류가 발생했습니다.",
-                error="QueryError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "질문 처리 중 오류가 발생했습니다.",
+                "error": "QueryError",
+                "detail": str(e)
+            }
         )
 
 
+async def lookup_chat_cache(request: ChatRequest, question_embedding) -> Optional[str]:
+    """
+    대화형 채팅의 세션별 시맨틱 캐시 조회
+    - 직전 질문을 그대로 다시 보낸 경우(답변 재생성)는 캐시를 사용하지 않음
+    - 히트 시 질문과 캐시된 답변을 세션 대화 기록에 추가하여, 사용자가 본 대화와 서버의 대화 기록을 일치시킴
+    """
+    bot = chatbot
+    if await anyio.to_thread.run_sync(bot.is_repeated_question, request.question, request.session_id):
+        return None
+    cached_answer = await anyio.to_thread.run_sync(
+        semantic_cache.lookup, question_embedding, request.session_id
+    )
+    if cached_answer is not None:
+        await anyio.to_thread.run_sync(bot.record_turn, request.question, cached_answer, request.session_id)
+    return cached_answer
+
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_bot(request: ChatRequest):
     """
@@ -372,21 +718,33 @@ async def chat_with_bot(request: ChatRequest):
     - Next.js 등 프론트엔드에서 사용하기 적합한 엔드포인트입니다.
     """
     if chatbot is None:
-        raise HTTPException(
-            status_code=503,
-            detail=ErrorResponse(
-                success=False,
-                message="챗봇이 초기화되지 않았습니다.",
-                error="ChatbotNotInitialized",
-                detail="/api/init 엔드포인트를 먼저 호출하세요."
-            ).dict()
-        )
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED_DETAIL)
     
     try:
+        # 질문 임베딩으로 같은 세션의 시맨틱 캐시 조회 (히트 시 LLM 호출 생략)
+        question_embedding = await embed_batcher.submit(request.question)
+        cached_answer = await lookup_chat_cache(request, question_embedding)
+        if cached_answer is not None:
+            return ChatResponse(
+                success=True,
+                answer=cached_answer,
+                session_id=request.session_id,
+                message="답변이 성공적으로 생성되었습니다.",
+                cache_hit=True
+            )
+        
         # RAGChatbot 클래스의 chat() 메서드가 세션 관리를 처리합니다
-        response_text = chatbot.chat(
-            question=request.question,
-            session_id=request.session_id
+        # 검색 + LLM 생성은 블로킹 호출이므로 스레드풀에서 실행
+        response_text = await anyio.to_thread.run_sync(
+            chatbot.chat,
+            request.question,
+            request.session_id
+        )
+        await anyio.to_thread.run_sync(
+            semantic_cache.add,
+            question_embedding,
+            response_text,
+            request.session_id
         )
         
         return ChatResponse(
@@ -395,18 +753,66 @@ async def chat_with_bot(request: ChatRequest):
             session_id=request.session_id,
             message="답변이 성공적으로 생성되었습니다."
         )
-    except Exception as e:
+    except ChatbotError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 처리 중 오류가 발생했습니다.",
-                error="ChatError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 처리 중 오류가 발생했습니다.",
+                "error": "ChatError",
+                "detail": str(e)
+            }
         )
 
 
+def _sse_event(data: dict) -> bytes:
+    """Server-Sent Events 형식의 이벤트 생성 (orjson으로 바로 UTF-8 바이트 인코딩)"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_with_bot_stream(request: ChatRequest):
+    """
+    대화형 채팅 - 스트리밍 (Server-Sent Events)
+    - /api/chat과 같은 세션/대화 기록을 사용합니다.
+    - 답변 토큰을 생성되는 즉시 `data: {"token": "..."}` 이벤트로 전송합니다.
+    - 마지막에 `data: {"done": true, "cache_hit": ...}` 이벤트를 전송합니다.
+    """
+    if chatbot is None:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED_DETAIL)
+    
+    question_embedding = await embed_batcher.submit(request.question)
+    cached_answer = await lookup_chat_cache(request, question_embedding)
+    
+    # 스트리밍 도중 /api/init으로 챗봇이 교체되어도 현재 인스턴스를 계속 사용
+    bot, cache = chatbot, semantic_cache
+    
+    def event_stream():
+        # 동기 제너레이터는 Starlette가 스레드풀에서 순회하므로 이벤트 루프를 막지 않음
+        if cached_answer is not None:
+            yield _sse_event({"token": cached_answer})
+            yield _sse_event({"done": True, "cache_hit": True})
+            return
+        
+        tokens = []
+        try:
+            for token in bot.stream_chat(request.question, request.session_id):
+                tokens.append(token)
+                yield _sse_event({"token": token})
+        except ChatbotError as e:
+            yield _sse_event({"error": "ChatError", "detail": str(e)})
+            return
+        
+        cache.add(question_embedding, "".join(tokens), request.session_id)
+        yield _sse_event({"done": True, "cache_hit": False})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.delete("/api/chat/session/{session_id}", response_model=ChatResetResponse)
 async def reset_chat_session(session_id: str):
     """
@@ -414,17 +820,12 @@ async def reset_chat_session(session_id: str):
     - DELETE 메서드를 사용하여 RESTful하게 구현
     """
     if chatbot is None:
-        raise HTTPException(
-            status_code=503,
-            detail=ErrorResponse(
-                success=False,
-                message="챗봇이 초기화되지 않았습니다.",
-                error="ChatbotNotInitialized",
-                detail="/api/init 엔드포인트를 먼저 호출하세요."
-            ).dict()
-        )
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED_DETAIL)
     
-    chatbot.reset_session(session_id)
+    # 세션 잠금을 기다릴 수 있으므로 스레드풀에서 실행 (이벤트 루프 블로킹 방지)
+    await anyio.to_thread.run_sync(chatbot.reset_session, session_id)
+    # 초기화 후 같은 session_id로 대화를 이어가도 이전 대화의 답변이 재사용되지 않도록 세션 캐시도 삭제
+    await anyio.to_thread.run_sync(semantic_cache.clear_session, session_id)
     return ChatResetResponse(
         success=True,
         session_id=session_id,
@@ -445,19 +846,14 @@ async def create_user(request: UserCreateRequest):
     """
     try:
         # 데이터베이스 연결 확인
-        if db.engine is None:
+        if db.pool is None:
             raise HTTPException(
                 status_code=503,
-                detail=ErrorResponse(
-                    success=False,
-                    message="데이터베이스에 연결되지 않았습니다.",
-                    error="DatabaseNotConnected",
-                    detail="서버 시작 시 데이터베이스 연결에 실패했습니다. 데이터베이스가 실행 중인지 확인하세요."
-                ).dict()
+                detail=DB_NOT_CONNECTED_DETAIL
             )
         
         # 요청 데이터 로깅 (디버깅용)
-        print(f"📥 받은 사용자 데이터: email={request.email}, name={request.name}, image={request.image}, provider={request.provider}")
+        logger.debug("📥 받은 사용자 데이터: email=%s, name=%s, provider=%s", request.email, request.name, request.provider)
         
         # 이메일 기반으로 사용자 조회/생성 (백엔드에서 userId 자동 생성 - SERIAL 시퀀스)
         user_data = await db.create_or_get_user_by_email(
@@ -485,129 +881,108 @@ async def create_user(request: UserCreateRequest):
         else:
             raise HTTPException(
                 status_code=500,
-                detail=ErrorResponse(
-                    success=False,
-                    message="회원정보 저장에 실패했습니다.",
-                    error="DatabaseError"
-                ).dict()
+                detail={
+                    "success": False,
+                    "message": "회원정보 저장에 실패했습니다.",
+                    "error": "DatabaseError",
+                    "detail": None
+                }
             )
-    except Exception as e:
-        # 에러 상세 정보 로깅
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"❌ 회원정보 저장 오류:")
-        print(f"   에러 메시지: {str(e)}")
-        print(f"   상세 트레이스:")
-        print(error_trace)
+    except DBError as e:
+        # 에러 상세 정보 로깅 (트레이스 포함)
+        logger.exception("❌ 회원정보 저장 오류: %s", e)
         
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="회원정보 저장 중 오류가 발생했습니다.",
-                error="UserCreationError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "회원정보 저장 중 오류가 발생했습니다.",
+                "error": "UserCreationError",
+                "detail": str(e)
+            }
         )
 
 
 # ==================== Chat History API 엔드포인트 ====================
 
-@app.get("/api/chats", response_model=ChatListResponse)
-async def get_chats(userId: str = Query(..., description="사용자 ID (문자열, INTEGER로 변환)")):
+def parse_user_id(userId: str = Query(..., description="사용자 ID (문자열, INTEGER로 변환)")) -> int:
+    """쿼리 파라미터 userId를 INTEGER로 변환 (변환 실패 시 400)"""
+    try:
+        return int(userId)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=INVALID_USER_ID_DETAIL)
+
+
+@app.get(
+    "/api/chats",
+    response_class=ORJSONResponse,
+    response_model=None,  # dict를 그대로 반환하므로 응답 모델 검증/인코딩 생략
+    responses={200: {"model": ChatListResponse}}  # API 문서용 스키마
+)
+async def get_chats(user_id: int = Depends(parse_user_id)):
     """
     채팅 목록 조회
     - 특정 사용자의 모든 채팅 기록을 최신순으로 반환
     """
     try:
-        # 문자열 userId를 INTEGER로 변환
-        try:
-            user_id_int = int(userId)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=ErrorResponse(
-                    success=False,
-                    message="잘못된 사용자 ID 형식입니다.",
-                    error="InvalidUserId",
-                    detail="userId는 정수여야 합니다."
-                ).dict()
-            )
-        chats_data = await db.get_chats_by_user(user_id_int)
-        
-        chats = []
-        for chat_data in chats_data:
-            # 채팅 목록에서는 메시지를 포함하지 않음 (성능 최적화)
-            # 필요시 GET /api/chats/{chatId}로 개별 조회
-            chat = ChatHistory(
-                id=chat_data['id'],
-                title=chat_data['title'],
-                userId=chat_data['user_id'],
-                createdAt=chat_data['created_at'].isoformat() if hasattr(chat_data['created_at'], 'isoformat') else str(chat_data['created_at']),
-                updatedAt=chat_data['updated_at'].isoformat() if hasattr(chat_data['updated_at'], 'isoformat') else str(chat_data['updated_at']),
-                messages=[]  # 목록 조회 시 메시지는 빈 배열
-            )
-            chats.append(chat)
+        chats_data = await db.get_chats_by_user(user_id)
         
-        return ChatListResponse(
-            success=True,
-            message=f"{len(chats)}개의 채팅을 찾았습니다.",
-            chats=chats
-        )
-    except Exception as e:
+        # 읽기 전용 목록이므로 Pydantic 모델을 만들지 않고 dict로 바로 직렬화
+        # 채팅 목록에서는 메시지를 포함하지 않음 (성능 최적화)
+        # 필요시 GET /api/chats/{chatId}로 개별 조회
+        return ORJSONResponse({
+            "success": True,
+            "message": f"{len(chats_data)}개의 채팅을 찾았습니다.",
+            "chats": [
+                {
+                    "id": chat.id,
+                    "title": chat.title,
+                    "userId": chat.user_id,
+                    "createdAt": chat.created_at,
+                    "updatedAt": chat.updated_at,
+                    "messages": []  # 목록 조회 시 메시지는 빈 배열
+                }
+                for chat in chats_data
+            ]
+        })
+    except DBError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 목록 조회 중 오류가 발생했습니다.",
-                error="ChatListError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 목록 조회 중 오류가 발생했습니다.",
+                "error": "ChatListError",
+                "detail": str(e)
+            }
         )
 
 
 @app.get("/api/chats/{chat_id}", response_model=ChatResponseModel)
-async def get_chat(chat_id: str, userId: str = Query(..., description="사용자 ID (문자열, INTEGER로 변환)")):
+async def get_chat(chat_id: str, user_id: int = Depends(parse_user_id)):
     """
     특정 채팅 조회
     - chat_id와 userId로 특정 채팅 기록을 조회
     """
     try:
-        # 문자열 userId를 INTEGER로 변환
-        try:
-            user_id_int = int(userId)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=ErrorResponse(
-                    success=False,
-                    message="잘못된 사용자 ID 형식입니다.",
-                    error="InvalidUserId",
-                    detail="userId는 정수여야 합니다."
-                ).dict()
-            )
-        chat_data = await db.get_chat(chat_id, user_id_int)
+        chat_data = await db.get_chat(chat_id, user_id)
         
         if not chat_data:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    success=False,
-                    message="채팅을 찾을 수 없습니다.",
-                    error="ChatNotFound"
-                ).dict()
+                detail=CHAT_NOT_FOUND_DETAIL
             )
         
+        # DB에서 읽은 신뢰할 수 있는 데이터이므로 검증 없이 모델 생성
         messages = [
-            Message(role=msg['role'], content=msg['content'])
+            Message.model_construct(role=msg['role'], content=msg['content'])
             for msg in chat_data['messages']
         ]
-        chat = ChatHistory(
+        chat = ChatHistory.model_construct(
             id=chat_data['id'],
             title=chat_data['title'],
             userId=chat_data['user_id'],
-            createdAt=chat_data['created_at'].isoformat() if hasattr(chat_data['created_at'], 'isoformat') else str(chat_data['created_at']),
-            updatedAt=chat_data['updated_at'].isoformat() if hasattr(chat_data['updated_at'], 'isoformat') else str(chat_data['updated_at']),
+            createdAt=chat_data['created_at'],
+            updatedAt=chat_data['updated_at'],
             messages=messages
         )
         
@@ -616,17 +991,15 @@ async def get_chat(chat_id: str, userId: str = Query(..., description="사용자
             message="채팅을 성공적으로 조회했습니다.",
             chat=chat
         )
-    except HTTPException:
-        raise
-    except Exception as e:
+    except DBError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 조회 중 오류가 발생했습니다.",
-                error="ChatRetrievalError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 조회 중 오류가 발생했습니다.",
+                "error": "ChatRetrievalError",
+                "detail": str(e)
+            }
         )
 
 
@@ -639,77 +1012,51 @@ async def create_chat(request: ChatCreateRequest):
     """
     try:
         # 요청 데이터 디버깅
-        print("=" * 60)
-        print("📥 POST /api/chats 요청 받음")
-        print(f"   userId: {request.userId}")
-        print(f"   title: {request.title}")
-        print(f"   messages 개수: {len(request.messages)}")
-        print(f"   messages 상세:")
-        for idx, msg in enumerate(request.messages):
-            print(f"      [{idx}] role={msg.role}, content={msg.content[:50]}...")
-        print("=" * 60)
+        logger.debug(
+            "📥 POST /api/chats 요청: userId=%s, title=%s, messages=%d개",
+            request.userId, request.title, len(request.messages)
+        )
         
         # 데이터베이스 연결 확인
-        if db.engine is None:
-            print("❌ 데이터베이스 엔진이 None입니다!")
+        if db.pool is None:
+            logger.warning("❌ 데이터베이스에 연결되지 않아 채팅을 생성할 수 없습니다.")
             raise HTTPException(
                 status_code=503,
-                detail=ErrorResponse(
-                    success=False,
-                    message="데이터베이스에 연결되지 않았습니다.",
-                    error="DatabaseNotConnected"
-                ).dict()
+                detail=DB_NOT_CONNECTED_DETAIL
             )
         
-        # 서버에서 chat_id 생성 (프론트엔드에서는 보내지 않음)
-        chat_id = str(uuid.uuid4())
-        print(f"🔍 생성된 chat_id: {chat_id}")
-        
         messages_data = [{"role": msg.role, "content": msg.content} for msg in request.messages]
-        print(f"🔍 변환된 messages_data: {len(messages_data)}개")
         
-        # 문자열 userId를 INTEGER로 변환
-        try:
-            user_id_int = int(request.userId)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=ErrorResponse(
-                    success=False,
-                    message="잘못된 사용자 ID 형식입니다.",
-                    error="InvalidUserId",
-                    detail="userId는 정수여야 합니다."
-                ).dict()
-            )
-        print(f"🔍 db.create_chat 호출 전: chat_id={chat_id}, title={request.title}, user_id={user_id_int}")
+        # chat_id는 DB 계층에서 시간 순 UUIDv7로 생성 (프론트엔드에서는 보내지 않음)
         chat_data = await db.create_chat(
-            chat_id=chat_id,
             title=request.title,
-            user_id=user_id_int,
+            user_id=request.userId,
             messages=messages_data
         )
-        print(f"🔍 db.create_chat 호출 후: chat_data={chat_data is not None}")
+        logger.debug("🔍 db.create_chat 결과: 성공=%s", chat_data is not None)
         
         if not chat_data:
             raise HTTPException(
                 status_code=500,
-                detail=ErrorResponse(
-                    success=False,
-                    message="채팅 생성에 실패했습니다.",
-                    error="ChatCreationError"
-                ).dict()
+                detail={
+                    "success": False,
+                    "message": "채팅 생성에 실패했습니다.",
+                    "error": "ChatCreationError",
+                    "detail": None
+                }
             )
         
+        # DB에서 읽은 신뢰할 수 있는 데이터이므로 검증 없이 모델 생성
         messages = [
-            Message(role=msg['role'], content=msg['content'])
+            Message.model_construct(role=msg['role'], content=msg['content'])
             for msg in chat_data['messages']
         ]
-        chat = ChatHistory(
+        chat = ChatHistory.model_construct(
             id=chat_data['id'],
             title=chat_data['title'],
             userId=chat_data['user_id'],
-            createdAt=chat_data['created_at'].isoformat() if hasattr(chat_data['created_at'], 'isoformat') else str(chat_data['created_at']),
-            updatedAt=chat_data['updated_at'].isoformat() if hasattr(chat_data['updated_at'], 'isoformat') else str(chat_data['updated_at']),
+            createdAt=chat_data['created_at'],
+            updatedAt=chat_data['updated_at'],
             messages=messages
         )
         
@@ -718,28 +1065,18 @@ async def create_chat(request: ChatCreateRequest):
             message="채팅이 성공적으로 생성되었습니다.",
             chat=chat
         )
-    except HTTPException:
-        raise
-    except Exception as e:
-        # 상세 에러 로깅
-        import traceback
-        error_trace = traceback.format_exc()
-        print("=" * 60)
-        print("❌ POST /api/chats 에러 발생!")
-        print(f"   에러 타입: {type(e).__name__}")
-        print(f"   에러 메시지: {str(e)}")
-        print(f"   상세 트레이스:")
-        print(error_trace)
-        print("=" * 60)
+    except DBError as e:
+        # 상세 에러 로깅 (트레이스 포함)
+        logger.exception("❌ POST /api/chats 에러 발생: %s: %s", type(e).__name__, e)
         
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 생성 중 오류가 발생했습니다.",
-                error="ChatCreationError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 생성 중 오류가 발생했습니다.",
+                "error": "ChatCreationError",
+                "detail": str(e)
+            }
         )
 
 
@@ -753,24 +1090,11 @@ async def update_chat(request: ChatUpdateRequest):
     try:
         # 프론트엔드에서 보낸 chatId 사용
         chat_id = request.chatId
-        # 문자열 userId를 INTEGER로 변환
-        try:
-            user_id_int = int(request.userId)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=ErrorResponse(
-                    success=False,
-                    message="잘못된 사용자 ID 형식입니다.",
-                    error="InvalidUserId",
-                    detail="userId는 정수여야 합니다."
-                ).dict()
-            )
         messages_data = [{"role": msg.role, "content": msg.content} for msg in request.messages]
         
         chat_data = await db.update_chat(
             chat_id=chat_id,
-            user_id=user_id_int,
+            user_id=request.userId,
             title=request.title,
             messages=messages_data
         )
@@ -778,23 +1102,20 @@ async def update_chat(request: ChatUpdateRequest):
         if not chat_data:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    success=False,
-                    message="채팅을 찾을 수 없습니다.",
-                    error="ChatNotFound"
-                ).dict()
+                detail=CHAT_NOT_FOUND_DETAIL
             )
         
+        # DB에서 읽은 신뢰할 수 있는 데이터이므로 검증 없이 모델 생성
         messages = [
-            Message(role=msg['role'], content=msg['content'])
+            Message.model_construct(role=msg['role'], content=msg['content'])
             for msg in chat_data['messages']
         ]
-        chat = ChatHistory(
+        chat = ChatHistory.model_construct(
             id=chat_data['id'],
             title=chat_data['title'],
             userId=chat_data['user_id'],
-            createdAt=chat_data['created_at'].isoformat() if hasattr(chat_data['created_at'], 'isoformat') else str(chat_data['created_at']),
-            updatedAt=chat_data['updated_at'].isoformat() if hasattr(chat_data['updated_at'], 'isoformat') else str(chat_data['updated_at']),
+            createdAt=chat_data['created_at'],
+            updatedAt=chat_data['updated_at'],
             messages=messages
         )
         
@@ -803,77 +1124,67 @@ async def update_chat(request: ChatUpdateRequest):
             message="채팅이 성공적으로 업데이트되었습니다.",
             chat=chat
         )
-    except HTTPException:
-        raise
-    except Exception as e:
+    except DBError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 업데이트 중 오류가 발생했습니다.",
-                error="ChatUpdateError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 업데이트 중 오류가 발생했습니다.",
+                "error": "ChatUpdateError",
+                "detail": str(e)
+            }
         )
 
 
 @app.delete("/api/chats/{chat_id}", response_model=BaseResponse)
-async def delete_chat(chat_id: str, userId: str = Query(..., description="사용자 ID (문자열, INTEGER로 변환)")):
+async def delete_chat(chat_id: str, user_id: int = Depends(parse_user_id)):
     """
     채팅 삭제
     - 특정 채팅 기록을 삭제
     """
     try:
-        # 문자열 userId를 INTEGER로 변환
-        try:
-            user_id_int = int(userId)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=ErrorResponse(
-                    success=False,
-                    message="잘못된 사용자 ID 형식입니다.",
-                    error="InvalidUserId",
-                    detail="userId는 정수여야 합니다."
-                ).dict()
-            )
-        success = await db.delete_chat(chat_id, user_id_int)
+        success = await db.delete_chat(chat_id, user_id)
         
         if not success:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    success=False,
-                    message="채팅을 찾을 수 없습니다.",
-                    error="ChatNotFound"
-                ).dict()
+                detail=CHAT_NOT_FOUND_DETAIL
             )
         
         return BaseResponse(
             success=True,
             message="채팅이 성공적으로 삭제되었습니다."
         )
-    except HTTPException:
-        raise
-    except Exception as e:
+    except DBError as e:
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                success=False,
-                message="채팅 삭제 중 오류가 발생했습니다.",
-                error="ChatDeletionError",
-                detail=str(e)
-            ).dict()
+            detail={
+                "success": False,
+                "message": "채팅 삭제 중 오류가 발생했습니다.",
+                "error": "ChatDeletionError",
+                "detail": str(e)
+            }
         )
 
 
 
 if __name__ == "__main__":
     # 서버 실행
+    # - uvloop(libuv 기반 이벤트 루프) + httptools(C 기반 HTTP 파서) 사용
+    # - uvloop는 Windows를 지원하지 않으므로 Windows에서는 기본 asyncio 루프 사용
+    # - reload는 워커 확장을 막으므로 DEV=1 일 때만 활성화
+    # - 워커마다 챗봇 세션을 따로 가지므로 WEB_CONCURRENCY > 1이면 로드밸런서의 sticky session 필요
+    # - 워커마다 DB 연결 풀도 따로 가지므로 WEB_CONCURRENCY x DB_POOL_MAX <= Postgres max_connections
+    dev_mode = os.getenv("DEV", "0") == "1"
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
-        port=8000,
-        reload=True  # 개발 모드 (코드 변경 시 자동 재시작)
+        port=int(os.getenv("PORT", "8000")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=1 if dev_mode else int(os.getenv("WEB_CONCURRENCY", "1")),
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", "75")),  # 프론트엔드/프록시와 연결 재사용
+        backlog=2048,  # 동시 접속이 몰릴 때 대기 가능한 연결 수
+        reload=dev_mode  # 개발 모드 (코드 변경 시 자동 재시작)
     )
 
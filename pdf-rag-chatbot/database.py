@@ -1,106 +1,262 @@
 """
-PostgreSQL 데이터베이스 연결 및 쿼리 모듈 (SQLAlchemy + asyncpg)
+PostgreSQL 데이터베이스 연결 및 쿼리 모듈 (asyncpg)
+- 테이블 스키마는 database_schema.sql 참고
 """
 import os
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, selectinload
-from sqlalchemy import String, Integer, Text, DateTime, ForeignKey, Index, select, delete, update, func
-from sqlalchemy.dialects.postgresql import insert
-
-
-class Base(DeclarativeBase):
-    """SQLAlchemy Base 클래스"""
-    pass
-
-
-class User(Base):
-    """사용자 모델"""
-    __tablename__ = "users"
-    
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
-    name: Mapped[str] = mapped_column(String(255), nullable=False)
-    image: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    provider: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    provider_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
-    
-    # 관계
-    chats: Mapped[List["Chat"]] = relationship("Chat", back_populates="user", cascade="all, delete-orphan")
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """모델을 딕셔너리로 변환"""
-        return {
-            "id": self.id,
-            "email": self.email,
-            "name": self.name,
-            "image": self.image,
-            "provider": self.provider,
-            "provider_id": self.provider_id,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
-
-
-class Chat(Base):
-    """채팅 모델"""
-    __tablename__ = "chats"
-    
-    id: Mapped[str] = mapped_column(String(255), primary_key=True)
-    title: Mapped[str] = mapped_column(String(500), nullable=False)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
-    
-    # 관계
-    user: Mapped["User"] = relationship("User", back_populates="chats")
-    messages: Mapped[List["Message"]] = relationship("Message", back_populates="chat", cascade="all, delete-orphan", order_by="Message.created_at")
-    
-    def to_dict(self, include_messages: bool = False) -> Dict[str, Any]:
-        """모델을 딕셔너리로 변환"""
-        result = {
-            "id": self.id,
-            "title": self.title,
-            "user_id": self.user_id,
-            "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
-        if include_messages:
-            result["messages"] = [msg.to_dict() for msg in self.messages]
-        return result
-
-
-class Message(Base):
-    """메시지 모델"""
-    __tablename__ = "messages"
-    
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    chat_id: Mapped[str] = mapped_column(String(255), ForeignKey("chats.id", ondelete="CASCADE"), nullable=False, index=True)
-    role: Mapped[str] = mapped_column(String(10), nullable=False)  # 'user' or 'bot'
-    content: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
-    
-    # 관계
-    chat: Mapped["Chat"] = relationship("Chat", back_populates="messages")
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """모델을 딕셔너리로 변환"""
-        return {
-            "role": self.role,
-            "content": self.content
-        }
+import time
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, List, Dict, AsyncIterator, TypedDict
+
+import asyncpg
+import orjson
+
+
+logger = logging.getLogger(__name__)
+
+
+# 연결 풀 크기 (DB_POOL_MIN개는 시작 시 미리 연결, 부하가 몰리면 DB_POOL_MAX개까지 확장)
+# - 워커 프로세스마다 풀을 따로 가지므로 WEB_CONCURRENCY x DB_POOL_MAX가 Postgres max_connections(기본값 100)를 넘지 않게 설정
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = max(int(os.getenv("DB_POOL_MAX", "10")), DB_POOL_MIN)
+
+
+class DBError(Exception):
+    """데이터베이스 작업 실패 (연결 오류, 쿼리 오류 등)"""
+
+
+class UserDict(TypedDict):
+    """users 테이블 행"""
+    id: int
+    email: str
+    name: str
+    image: Optional[str]
+    provider: Optional[str]
+    provider_id: Optional[str]
+    created_at: str  # ISO 8601 (UTC)
+    updated_at: str
+
+
+class MessageDict(TypedDict):
+    """채팅 메시지 ('user' 또는 'bot')"""
+    role: str
+    content: str
+
+
+class ChatDict(TypedDict):
+    """chats 테이블 행 (메시지 제외)"""
+    id: str
+    title: str
+    user_id: int
+    created_at: str  # ISO 8601 (UTC)
+    updated_at: str
+
+
+@dataclass(slots=True, frozen=True)
+class ChatRow:
+    """채팅 목록용 행 (필드 순서는 CHAT_COLUMNS와 같음, dict보다 작고 빠르게 생성됨)"""
+    id: str
+    title: str
+    user_id: int
+    created_at: str
+    updated_at: str
+
+
+class ChatWithMessagesDict(ChatDict):
+    """메시지를 포함한 채팅"""
+    messages: List[MessageDict]
+
+
+def _encode_timestamptz(value) -> str:
+    """파라미터로 넘긴 datetime(또는 ISO 문자열)을 PostgreSQL 텍스트 형식으로 변환"""
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _decode_timestamptz(value: str) -> str:
+    """
+    TIMESTAMPTZ 텍스트 값을 datetime 객체를 만들지 않고 바로 ISO 8601 문자열로 변환
+    - 세션 설정(DateStyle=ISO, TimeZone=UTC)에서 값은 항상 '2024-01-01 12:00:00.123456+00' 형태
+    """
+    return value.replace(" ", "T", 1) + ":00"
+
+
+def _encode_jsonb(value) -> bytes:
+    """jsonb 바이너리 형식 = 버전 바이트(1) + JSON 텍스트"""
+    return b"\x01" + orjson.dumps(value)
+
+
+def _decode_jsonb(value: bytes):
+    return orjson.loads(value[1:])
+
+
+def uuid7() -> str:
+    """
+    시간 순으로 정렬되는 UUIDv7 문자열 생성 (RFC 9562)
+    - 앞 48비트가 밀리초 타임스탬프이므로 새 채팅 ID가 항상 인덱스의 오른쪽 끝에 추가됨
+      (랜덤 UUIDv4처럼 B-tree 페이지 분할이 흩어지지 않음)
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant (RFC 4122)
+    return str(uuid.UUID(int=value))
+
+
+# SELECT 컬럼 순서 고정 (아래 *_row_to_dict가 위치 인덱스로 읽으므로 순서를 바꾸면 함께 수정)
+USER_COLUMNS = "id, email, name, image, provider, provider_id, created_at, updated_at"
+CHAT_COLUMNS = "id, title, user_id, created_at, updated_at"
+
+
+def _user_row_to_dict(r) -> UserDict:
+    """USER_COLUMNS 순서의 행을 딕셔너리로 변환"""
+    return {
+        "id": r[0],
+        "email": r[1],
+        "name": r[2],
+        "image": r[3],
+        "provider": r[4],
+        "provider_id": r[5],
+        "created_at": r[6],
+        "updated_at": r[7]
+    }
+
+
+def _chat_row_to_dict(r) -> ChatDict:
+    """CHAT_COLUMNS 순서의 행을 딕셔너리로 변환"""
+    return {"id": r[0], "title": r[1], "user_id": r[2], "created_at": r[3], "updated_at": r[4]}
+
+
+# 사용자 생성 또는 업데이트 (이메일이 이미 있으면 정보 갱신)
+UPSERT_USER_SQL = f"""
+    INSERT INTO users (email, name, image, provider, provider_id)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (email) DO UPDATE SET
+        name = EXCLUDED.name,
+        image = EXCLUDED.image,
+        provider = EXCLUDED.provider,
+        provider_id = EXCLUDED.provider_id,
+        updated_at = now()
+    RETURNING {USER_COLUMNS}
+"""
+
+GET_USER_SQL = f"SELECT {USER_COLUMNS} FROM users WHERE id = $1"
+
+GET_USER_BY_EMAIL_SQL = f"SELECT {USER_COLUMNS} FROM users WHERE email = $1"
+
+# 채팅 생성 (서버 기본값인 생성/수정 시각은 RETURNING으로 함께 받음)
+INSERT_CHAT_SQL = """
+    INSERT INTO chats (id, title, user_id)
+    VALUES ($1, $2, $3)
+    RETURNING created_at, updated_at
+"""
+
+INSERT_MESSAGE_SQL = "INSERT INTO messages (chat_id, role, content) VALUES ($1, $2, $3)"
+
+# 채팅 + 메시지 목록을 한 행으로 조회 (메시지는 PostgreSQL이 jsonb 배열로 모아서 반환)
+GET_CHAT_SQL = f"""
+    SELECT {CHAT_COLUMNS},
+        COALESCE(
+            (SELECT jsonb_agg(jsonb_build_object('role', m.role, 'content', m.content) ORDER BY m.created_at, m.id)
+             FROM messages m WHERE m.chat_id = chats.id),
+            '[]'::jsonb
+        ) AS messages
+    FROM chats
+    WHERE id = $1 AND user_id = $2
+"""
+
+GET_MESSAGES_SQL = "SELECT id, role, content FROM messages WHERE chat_id = $1 ORDER BY created_at, id"
+
+DELETE_MESSAGES_SQL = "DELETE FROM messages WHERE id = ANY($1::int[])"
+
+GET_CHATS_BY_USER_SQL = f"SELECT {CHAT_COLUMNS} FROM chats WHERE user_id = $1 ORDER BY updated_at DESC"
+
+# 메시지 추가 + 채팅 updated_at 갱신을 한 번의 왕복으로 처리 (writable CTE)
+ADD_MESSAGE_SQL = """
+    WITH ins AS (
+        INSERT INTO messages (chat_id, role, content)
+        VALUES ($1, $2, $3)
+        RETURNING chat_id
+    )
+    UPDATE chats SET updated_at = now()
+    FROM ins
+    WHERE chats.id = ins.chat_id
+"""
+
+# 채팅 제목/updated_at 갱신 (본인 채팅이 아니면 0행)
+UPDATE_CHAT_SQL = f"""
+    UPDATE chats SET title = COALESCE($3::varchar, title), updated_at = now()
+    WHERE id = $1 AND user_id = $2
+    RETURNING {CHAT_COLUMNS}
+"""
+
+# 기존 메시지 삭제 + 채팅 제목/updated_at 갱신을 한 번의 왕복으로 처리
+# (두 구문이 같은 스냅샷을 보므로 본인 채팅인지 EXISTS로 함께 확인)
+REPLACE_CHAT_SQL = f"""
+    WITH del AS (
+        DELETE FROM messages
+        WHERE chat_id = $1
+          AND EXISTS (SELECT 1 FROM chats WHERE id = $1 AND user_id = $2)
+    )
+    UPDATE chats SET title = COALESCE($3::varchar, title), updated_at = now()
+    WHERE id = $1 AND user_id = $2
+    RETURNING {CHAT_COLUMNS}
+"""
+
+DELETE_CHAT_SQL = "DELETE FROM chats WHERE id = $1 AND user_id = $2 RETURNING id"
+
+# 연결마다 한 번 prepare해 두고 바로 실행하는 구문 (구문 캐시 조회/재준비 없음)
+# 스키마를 바꾼 뒤에는 서버를 재시작해야 새 구문으로 다시 prepare됨
+HOT_SQL = {
+    "upsert_user": UPSERT_USER_SQL,
+    "get_user": GET_USER_SQL,
+    "get_user_by_email": GET_USER_BY_EMAIL_SQL,
+    "insert_chat": INSERT_CHAT_SQL,
+    "insert_message": INSERT_MESSAGE_SQL,
+    "get_chat": GET_CHAT_SQL,
+    "get_messages": GET_MESSAGES_SQL,
+    "delete_messages": DELETE_MESSAGES_SQL,
+    "get_chats_by_user": GET_CHATS_BY_USER_SQL,
+    "add_message": ADD_MESSAGE_SQL,
+    "update_chat": UPDATE_CHAT_SQL,
+    "replace_chat": REPLACE_CHAT_SQL,
+    "delete_chat": DELETE_CHAT_SQL,
+}
+
+
+class _Connection(asyncpg.Connection):
+    """미리 prepare한 구문(stmts)을 함께 들고 있는 연결"""
+    stmts: Dict[str, asyncpg.prepared_stmt.PreparedStatement]
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """풀에 새 연결이 만들어질 때마다 TIMESTAMPTZ / JSONB 코덱 등록 후 자주 쓰는 구문을 미리 prepare"""
+    await conn.set_type_codec(
+        "timestamptz",
+        encoder=_encode_timestamptz,
+        decoder=_decode_timestamptz,
+        schema="pg_catalog",
+        format="text"
+    )
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        schema="pg_catalog",
+        format="binary"
+    )
+    # 코덱을 등록한 뒤에 prepare해야 구문의 결과 디코더에 위 코덱이 반영됨
+    conn.stmts = {name: await conn.prepare(sql) for name, sql in HOT_SQL.items()}
+
 
 
 class Database:
-    """데이터베이스 연결 및 쿼리 관리 클래스 (SQLAlchemy + asyncpg)"""
-    
+    """데이터베이스 연결 및 쿼리 관리 클래스 (asyncpg 연결 풀)"""
+
     def __init__(self):
-        self.engine = None
-        self.async_session_maker: Optional[async_sessionmaker[AsyncSession]] = None
-    
+        self.pool: Optional[asyncpg.Pool] = None
+
     async def connect(self):
         """데이터베이스 연결 풀 생성"""
         db_user = os.getenv("DB_USER")
@@ -112,264 +268,203 @@ class Database:
             "DATABASE_URL",
             f"postgresql://{db_host}:{db_port}/{db_name}"
         )
-        
-        # jdbc:postgresql:// 형식을 postgresql+asyncpg:// 형식으로 변환
+
+        # jdbc:postgresql:// 또는 postgresql+asyncpg:// 형식을 postgresql:// 형식으로 변환
         if database_url.startswith("jdbc:postgresql://"):
-            database_url = database_url.replace("jdbc:postgresql://", "postgresql+asyncpg://")
-        elif database_url.startswith("postgresql://"):
-            database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-        
+            database_url = database_url.replace("jdbc:postgresql://", "postgresql://", 1)
+        elif database_url.startswith("postgresql+asyncpg://"):
+            database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
         # 환경변수에서 직접 URL을 가져오지 않은 경우 구성
-        if database_url == f"postgresql+asyncpg://{db_host}:{db_port}/{db_name}":
+        if database_url == f"postgresql://{db_host}:{db_port}/{db_name}":
             if db_password:
-                database_url = f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+                database_url = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
             else:
-                database_url = f"postgresql+asyncpg://{db_user}@{db_host}:{db_port}/{db_name}"
-        
+                database_url = f"postgresql://{db_user}@{db_host}:{db_port}/{db_name}"
+
         try:
-            self.engine = create_async_engine(
+            # create_pool은 min_size개의 연결을 미리 열어 둠 (첫 요청들이 연결 수립을 기다리지 않음)
+            self.pool = await asyncpg.create_pool(
                 database_url,
-                pool_size=10,
-                max_overflow=20,
-                pool_pre_ping=True,
-                echo=False  # SQL 쿼리 로깅 (디버깅 시 True로 변경)
+                min_size=DB_POOL_MIN,
+                max_size=DB_POOL_MAX,
+                max_inactive_connection_lifetime=1800,
+                command_timeout=60,
+                # 스키마가 고정이므로 연결별 prepared statement 캐시를 넉넉히 두고 만료시키지 않음
+                statement_cache_size=1024,
+                max_cached_statement_lifetime=0,
+                max_cacheable_statement_size=1024 * 15,
+                # 타임스탬프를 항상 같은 텍스트 형식(UTC)으로 받아 ISO 문자열로 바로 변환
+                server_settings={"DateStyle": "ISO", "TimeZone": "UTC"},
+                connection_class=_Connection,
+                init=_init_connection
             )
-            self.async_session_maker = async_sessionmaker(
-                self.engine,
-                class_=AsyncSession,
-                expire_on_commit=False,
-                autoflush=False,
-                autocommit=False
-            )
-            print(f"✅ 데이터베이스 연결 성공: {db_host}:{db_port}/{db_name}")
+            # uvicorn이 uvloop을 설치했는지 확인 (uvloop이면 asyncpg 처리량이 크게 늘어남)
+            loop_impl = type(asyncio.get_running_loop()).__module__.split(".")[0]
+            logger.info("✅ 데이터베이스 연결 성공: %s:%s/%s (이벤트 루프: %s)", db_host, db_port, db_name, loop_impl)
         except Exception as e:
-            print(f"❌ 데이터베이스 연결 실패: {e}")
+            logger.error("❌ 데이터베이스 연결 실패: %s", e)
             raise
-    
+
     async def close(self):
         """데이터베이스 연결 풀 종료"""
-        if self.engine:
-            await self.engine.dispose()
-    
-    def get_session(self) -> AsyncSession:
-        """비동기 세션 생성"""
-        if not self.async_session_maker:
-            raise RuntimeError("데이터베이스가 연결되지 않았습니다. connect()를 먼저 호출하세요.")
-        return self.async_session_maker()
-    
+        if self.pool:
+            await self.pool.close()
+
+    @asynccontextmanager
+    async def acquire(self, conn: Optional[asyncpg.Connection] = None) -> AsyncIterator[asyncpg.Connection]:
+        """
+        풀에서 연결을 빌림 (연결을 쓰는 동안 발생한 DB 오류는 DBError로 변환)
+
+        Args:
+            conn: 호출자가 db.acquire()로 이미 빌린 연결 (주면 새로 빌리지 않고 그대로 사용)
+        """
+        if conn is None and self.pool is None:
+            raise DBError("데이터베이스가 연결되지 않았습니다. connect()를 먼저 호출하세요.")
+        try:
+            if conn is not None:
+                yield conn
+            else:
+                async with self.pool.acquire() as conn:
+                    yield conn
+        except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError) as e:
+            raise DBError(str(e)) from e
+
     # ==================== User 관련 메서드 ====================
-    
-    async def create_user(self, email: str, name: str, image: Optional[str] = None, provider: Optional[str] = None, provider_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+
+    async def create_user(self, email: str, name: str, image: Optional[str] = None, provider: Optional[str] = None, provider_id: Optional[str] = None, conn: Optional[asyncpg.Connection] = None) -> Optional[UserDict]:
         """사용자 생성 또는 업데이트 (id는 시퀀스로 자동 생성)"""
-        try:
-            async with self.get_session() as session:
-                # PostgreSQL의 ON CONFLICT 사용
-                from sqlalchemy.dialects.postgresql import insert as pg_insert
-                
-                insert_stmt = pg_insert(User).values(
-                    email=email,
-                    name=name,
-                    image=image,
-                    provider=provider,
-                    provider_id=provider_id
-                )
-                
-                upsert_stmt = insert_stmt.on_conflict_do_update(
-                    index_elements=['email'],
-                    set_=dict(
-                        name=insert_stmt.excluded.name,
-                        image=insert_stmt.excluded.image,
-                        provider=insert_stmt.excluded.provider,
-                        provider_id=insert_stmt.excluded.provider_id,
-                        updated_at=func.now()
-                    )
-                )
-                
-                stmt = upsert_stmt.returning(User)
-                result = await session.execute(stmt)
-                await session.commit()
-                user = result.scalar_one()
-                return user.to_dict()
-        except Exception as e:
-            print(f"❌ create_user 오류: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            raise
-    
-    async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        async with self.acquire(conn) as conn:
+            # PostgreSQL의 ON CONFLICT 사용
+            row = await conn.stmts["upsert_user"].fetchrow(email, name, image, provider, provider_id)
+            return _user_row_to_dict(row)
+
+    async def get_user(self, user_id: int) -> Optional[UserDict]:
         """사용자 조회 (user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            stmt = select(User).where(User.id == user_id)
-            result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
-            return user.to_dict() if user else None
-    
-    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        async with self.acquire() as conn:
+            row = await conn.stmts["get_user"].fetchrow(user_id)
+            return _user_row_to_dict(row) if row else None
+
+    async def get_user_by_email(self, email: str) -> Optional[UserDict]:
         """이메일로 사용자 조회"""
-        async with self.get_session() as session:
-            stmt = select(User).where(User.email == email)
-            result = await session.execute(stmt)
-            user = result.scalar_one_or_none()
-            return user.to_dict() if user else None
-    
-    async def create_or_get_user_by_email(self, email: str, name: str, image: Optional[str] = None, provider: Optional[str] = None, provider_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        async with self.acquire() as conn:
+            row = await conn.stmts["get_user_by_email"].fetchrow(email)
+            return _user_row_to_dict(row) if row else None
+
+    async def create_or_get_user_by_email(self, email: str, name: str, image: Optional[str] = None, provider: Optional[str] = None, provider_id: Optional[str] = None) -> Optional[UserDict]:
         """이메일로 사용자 조회 후 없으면 생성 (id는 시퀀스로 자동 생성)"""
-        # create_user가 ON CONFLICT (email)을 사용하므로 자동으로 조회/생성/업데이트 처리
-        return await self.create_user(email, name, image, provider, provider_id)
-    
+        async with self.acquire() as conn:
+            # 대부분의 로그인은 정보가 바뀌지 않은 기존 사용자이므로 먼저 조회만 하고 쓰기를 생략
+            row = await conn.stmts["get_user_by_email"].fetchrow(email)
+            if row is not None and (row[2], row[3], row[4], row[5]) == (name, image, provider, provider_id):
+                return _user_row_to_dict(row)
+            # 없거나 정보가 바뀐 경우: create_user가 ON CONFLICT (email)로 생성/업데이트 처리
+            return await self.create_user(email, name, image, provider, provider_id, conn=conn)
+
     # ==================== Chat 관련 메서드 ====================
-    
-    async def create_chat(self, chat_id: str, title: str, user_id: int, messages: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
-        """새 채팅 생성 및 메시지 저장 (user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            try:
-                # 채팅 생성
-                chat = Chat(id=chat_id, title=title, user_id=user_id)
-                session.add(chat)
-                await session.flush()  # ID를 얻기 위해 flush
-                
-                # 메시지들 저장
+
+    async def create_chat(self, title: str, user_id: int, messages: List[Dict[str, str]], chat_id: Optional[str] = None, conn: Optional[asyncpg.Connection] = None) -> Optional[ChatWithMessagesDict]:
+        """새 채팅 생성 및 메시지 저장 (user_id는 INTEGER, chat_id를 주지 않으면 UUIDv7로 생성)"""
+        if chat_id is None:
+            chat_id = uuid7()
+        async with self.acquire(conn) as conn:
+            async with conn.transaction():
+                created_at, updated_at = await conn.stmts["insert_chat"].fetchrow(chat_id, title, user_id)
+
+                # 메시지들 저장 (한 번의 executemany로 일괄 INSERT)
                 if messages:
-                    for msg in messages:
-                        message = Message(
-                            chat_id=chat_id,
-                            role=msg['role'],
-                            content=msg['content']
-                        )
-                        session.add(message)
-                
-                await session.commit()
-                
-                # 채팅과 메시지를 다시 조회하여 반환
-                await session.refresh(chat)
-                stmt = select(Chat).where(Chat.id == chat_id).options(
-                    selectinload(Chat.messages)
-                )
-                result = await session.execute(stmt)
-                chat = result.scalar_one()
-                
-                chat_dict = chat.to_dict(include_messages=True)
-                return chat_dict
-            except Exception as e:
-                await session.rollback()
-                print(f"❌ create_chat 오류: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                raise
-    
-    async def get_chat(self, chat_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+                    await conn.stmts["insert_message"].executemany(
+                        [(chat_id, msg['role'], msg['content']) for msg in messages]
+                    )
+
+            # 다시 조회하지 않고 입력값으로 결과 구성
+            return {
+                "id": chat_id,
+                "title": title,
+                "user_id": user_id,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "messages": [{"role": msg['role'], "content": msg['content']} for msg in messages]
+            }
+
+    async def get_chat(self, chat_id: str, user_id: int) -> Optional[ChatWithMessagesDict]:
         """특정 채팅 조회 (메시지 포함, user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            stmt = (
-                select(Chat)
-                .where(Chat.id == chat_id, Chat.user_id == user_id)
-                .options(selectinload(Chat.messages))
-            )
-            result = await session.execute(stmt)
-            chat = result.scalar_one_or_none()
-            return chat.to_dict(include_messages=True) if chat else None
-    
-    async def get_chats_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        async with self.acquire() as conn:
+            # 한 번의 왕복으로 채팅과 메시지를 함께 조회 (messages는 이미 dict 리스트로 디코딩됨)
+            row = await conn.stmts["get_chat"].fetchrow(chat_id, user_id)
+            if row is None:
+                return None
+            chat_dict = _chat_row_to_dict(row)
+            chat_dict["messages"] = row[5]
+            return chat_dict
+
+    async def get_chats_by_user(self, user_id: int) -> List[ChatRow]:
         """사용자의 모든 채팅 목록 조회 (최신순, 메시지 제외, user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            stmt = (
-                select(Chat)
-                .where(Chat.user_id == user_id)
-                .order_by(Chat.updated_at.desc())
-            )
-            result = await session.execute(stmt)
-            chats = result.scalars().all()
-            return [chat.to_dict(include_messages=False) for chat in chats]
-    
-    async def add_message(self, chat_id: str, role: str, content: str) -> bool:
-        """채팅에 메시지 추가"""
-        async with self.get_session() as session:
-            try:
-                # 메시지 추가
-                message = Message(chat_id=chat_id, role=role, content=content)
-                session.add(message)
-                
-                # 채팅의 updated_at 업데이트
-                stmt = (
-                    update(Chat)
-                    .where(Chat.id == chat_id)
-                    .values(updated_at=func.now())
-                )
-                await session.execute(stmt)
-                
-                await session.commit()
-                return True
-            except Exception as e:
-                await session.rollback()
-                print(f"❌ add_message 오류: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                raise
-    
-    async def update_chat(self, chat_id: str, user_id: int, title: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None) -> Optional[Dict[str, Any]]:
-        """채팅 업데이트 (user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            try:
-                # 채팅 조회
-                stmt = select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
-                result = await session.execute(stmt)
-                chat = result.scalar_one_or_none()
-                
-                if not chat:
+        async with self.acquire() as conn:
+            rows = await conn.stmts["get_chats_by_user"].fetch(user_id)
+            return [ChatRow(*r) for r in rows]
+
+    async def add_message(self, chat_id: str, role: str, content: str, conn: Optional[asyncpg.Connection] = None) -> bool:
+        """채팅에 메시지 추가 (채팅의 updated_at도 함께 갱신)"""
+        async with self.acquire(conn) as conn:
+            await conn.stmts["add_message"].fetch(chat_id, role, content)
+            return True
+
+    async def update_chat(self, chat_id: str, user_id: int, title: Optional[str] = None, messages: Optional[List[Dict[str, str]]] = None, replace_all: bool = False, conn: Optional[asyncpg.Connection] = None) -> Optional[ChatWithMessagesDict]:
+        """
+        채팅 업데이트 (user_id는 INTEGER)
+
+        Args:
+            messages: 채팅의 전체 메시지 목록 (None이면 메시지는 그대로 두고 제목만 갱신)
+            replace_all: True면 기존 메시지를 모두 지우고 다시 저장,
+                         False면 기존 메시지와 앞부분이 같은 만큼은 두고 달라진 뒷부분만 교체
+        """
+        async with self.acquire(conn) as conn:
+            async with conn.transaction():
+                # 제목/updated_at 갱신 (전체 교체 시 기존 메시지 삭제도 같은 구문에서 처리)
+                stmt = "replace_chat" if messages is not None and replace_all else "update_chat"
+                row = await conn.stmts[stmt].fetchrow(chat_id, user_id, title)
+                if row is None:
                     return None
-                
-                # 제목 업데이트
-                if title is not None:
-                    chat.title = title
-                
-                # 메시지 전체 교체 (기존 메시지 삭제 후 새로 추가)
-                if messages is not None:
-                    # 기존 메시지 삭제
-                    delete_stmt = delete(Message).where(Message.chat_id == chat_id)
-                    await session.execute(delete_stmt)
-                    
-                    # 새 메시지 추가
-                    for msg in messages:
-                        message = Message(
-                            chat_id=chat_id,
-                            role=msg['role'],
-                            content=msg['content']
-                        )
-                        session.add(message)
-                
-                await session.commit()
-                
-                # 업데이트된 채팅 조회
-                stmt = select(Chat).where(Chat.id == chat_id).options(
-                    selectinload(Chat.messages)
-                )
-                result = await session.execute(stmt)
-                chat = result.scalar_one()
-                return chat.to_dict(include_messages=True)
-            except Exception as e:
-                await session.rollback()
-                print(f"❌ update_chat 오류: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                raise
-    
-    async def delete_chat(self, chat_id: str, user_id: int) -> bool:
+                chat_dict = _chat_row_to_dict(row)
+
+                if messages is None:
+                    # 메시지를 교체하지 않은 경우에만 기존 메시지 조회
+                    rows = await conn.stmts["get_messages"].fetch(chat_id)
+                    chat_dict["messages"] = [{"role": r[1], "content": r[2]} for r in rows]
+                    return chat_dict
+
+                new_messages = messages
+                if not replace_all:
+                    # 보통은 기존 대화 뒤에 메시지가 덧붙은 경우이므로 일치하는 앞부분은 다시 쓰지 않음
+                    rows = await conn.stmts["get_messages"].fetch(chat_id)
+                    keep = 0
+                    for r, msg in zip(rows, messages):
+                        if r[1] != msg['role'] or r[2] != msg['content']:
+                            break
+                        keep += 1
+                    stale_ids = [r[0] for r in rows[keep:]]
+                    if stale_ids:
+                        await conn.stmts["delete_messages"].fetch(stale_ids)
+                    new_messages = messages[keep:]
+
+                # 새 메시지 추가 (한 번의 executemany로 일괄 INSERT)
+                if new_messages:
+                    await conn.stmts["insert_message"].executemany(
+                        [(chat_id, msg['role'], msg['content']) for msg in new_messages]
+                    )
+                # 다시 조회하지 않고 입력값으로 결과 구성
+                chat_dict["messages"] = [{"role": msg['role'], "content": msg['content']} for msg in messages]
+
+            return chat_dict
+
+    async def delete_chat(self, chat_id: str, user_id: int, conn: Optional[asyncpg.Connection] = None) -> bool:
         """채팅 삭제 (CASCADE로 메시지도 자동 삭제됨, user_id는 INTEGER)"""
-        async with self.get_session() as session:
-            try:
-                stmt = delete(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
-                result = await session.execute(stmt)
-                await session.commit()
-                
-                # 삭제된 행 수 확인
-                return result.rowcount > 0
-            except Exception as e:
-                await session.rollback()
-                print(f"❌ delete_chat 오류: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
-                raise
+        async with self.acquire(conn) as conn:
+            # 삭제된 행이 있으면 그 id가 반환됨
+            deleted_id = await conn.stmts["delete_chat"].fetchval(chat_id, user_id)
+            return deleted_id is not None
 
 
 # 전역 데이터베이스 인스턴스
-db = Database()
\ No newline at end of file
+db = Database()
@@ -8,8 +8,8 @@ CREATE TABLE IF NOT EXISTS users (
     image TEXT,
     provider VARCHAR(255),
     provider_id VARCHAR(255),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Chats 테이블 생성 (채팅방 정보)
@@ -17,8 +17,8 @@ CREATE TABLE IF NOT EXISTS chats (
     id VARCHAR(255) PRIMARY KEY,
     title VARCHAR(500) NOT NULL,
     user_id INTEGER NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
@@ -28,17 +28,37 @@ CREATE TABLE IF NOT EXISTS messages (
     chat_id VARCHAR(255) NOT NULL,
     role VARCHAR(10) NOT NULL CHECK (role IN ('user', 'bot')),
     content TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_chat FOREIGN KEY (chat_id) REFERENCES chats(id) ON DELETE CASCADE
 );
 
+-- 기존 TIMESTAMP 컬럼을 TIMESTAMPTZ로 변환 (이전 스키마로 만든 DB에서 한 번만 실행)
+-- 기존 값은 현재 세션의 TimeZone 기준 시각으로 해석되므로, 데이터를 저장하던 서버와 같은 TimeZone에서 실행하세요
+-- ALTER TABLE users ALTER COLUMN created_at TYPE TIMESTAMPTZ, ALTER COLUMN updated_at TYPE TIMESTAMPTZ;
+-- ALTER TABLE chats ALTER COLUMN created_at TYPE TIMESTAMPTZ, ALTER COLUMN updated_at TYPE TIMESTAMPTZ;
+-- ALTER TABLE messages ALTER COLUMN created_at TYPE TIMESTAMPTZ;
+
 -- 인덱스 생성 (성능 최적화)
-CREATE INDEX IF NOT EXISTS idx_chats_user_id ON chats(user_id);
 CREATE INDEX IF NOT EXISTS idx_chats_created_at ON chats(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages(chat_id);
 CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
 
+-- 채팅 목록 조회 (WHERE user_id = ? ORDER BY updated_at DESC): 정렬 없이 index-only scan
+CREATE INDEX IF NOT EXISTS idx_chats_user_updated ON chats(user_id, updated_at DESC) INCLUDE (id, title, created_at);
+-- 채팅 메시지 조회 (WHERE chat_id = ? ORDER BY created_at, id): 정렬 없이 인덱스 순서대로 읽음
+-- (content는 길이 제한이 없어 B-tree 항목 크기 한도를 넘을 수 있으므로 INCLUDE하지 않음)
+CREATE INDEX IF NOT EXISTS idx_messages_chat_created ON messages(chat_id, created_at, id);
+
+-- 위 복합 인덱스의 앞 컬럼과 겹치는 단일 컬럼 인덱스 제거 (이전 스키마로 만든 DB용)
+DROP INDEX IF EXISTS idx_chats_user_id;
+DROP INDEX IF EXISTS idx_messages_chat_id;
+
+-- 운영 중인 DB에는 테이블 잠금 없이 CONCURRENTLY로 만든 뒤 통계를 갱신하세요 (트랜잭션 밖에서 실행)
+-- CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chats_user_updated ON chats(user_id, updated_at DESC) INCLUDE (id, title, created_at);
+-- CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_chat_created ON messages(chat_id, created_at, id);
+-- ANALYZE chats;
+-- ANALYZE messages;
+
 -- updated_at 자동 업데이트를 위한 트리거 함수
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -0,0 +1,114 @@
+"""
+질문 임베딩 마이크로 배칭 모듈
+- 짧은 시간 안에 동시에 들어온 질문들을 모아 임베딩 모델을 한 번만 호출
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+import anyio
+
+# 배처 종료 신호 (이 항목 앞에 들어온 질문까지 처리한 뒤 종료)
+_STOP = object()
+
+
+class EmbedBatcher:
+    """동시 요청의 질문 임베딩을 모아서 한 번에 계산하는 배처"""
+
+    def __init__(self, embed_model, max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        """
+        Args:
+            embed_model: get_query_embedding_batch()를 제공하는 임베딩 모델
+            max_batch_size: 한 번에 임베딩할 최대 질문 수
+            max_wait_ms: 첫 질문 이후 배치를 모으기 위해 기다리는 최대 시간 (밀리초)
+        """
+        self.embed_model = embed_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self):
+        """배치 처리 태스크 시작 (실행 중인 이벤트 루프 안에서 호출)"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        배처 종료
+        - 새 질문은 더 이상 받지 않고, 이미 들어온 질문은 모두 임베딩한 뒤 종료
+        - 처리 도중 태스크가 취소되면 남은 질문은 모두 예외로 응답 (대기 중인 요청이 멈추지 않도록)
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            self._queue.put_nowait(_STOP)
+            await self._task
+            self._task = None
+
+    async def submit(self, question: str) -> List[float]:
+        """질문을 배치에 넣고 임베딩 결과를 기다림"""
+        if self._closed or self._task is None:
+            raise RuntimeError("임베딩 배처가 실행 중이 아닙니다.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((question, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                stopping = False
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                await self._flush(batch)
+                batch = []
+                if stopping:
+                    return
+        finally:
+            # 취소 등으로 처리하지 못한 질문은 예외로 응답
+            error = RuntimeError("임베딩 배처가 종료되었습니다.")
+            pending = batch
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    pending.append(item)
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        # 같은 질문이 여러 번 들어온 경우 한 번만 임베딩
+        questions = list(dict.fromkeys(question for question, _ in batch))
+        try:
+            embeddings = await anyio.to_thread.run_sync(
+                self.embed_model.get_query_embedding_batch,
+                questions
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_question = dict(zip(questions, embeddings))
+        for question, future in batch:
+            if not future.done():  # 요청이 취소된 경우 건너뜀
+                future.set_result(by_question[question])
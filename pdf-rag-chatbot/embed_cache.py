@@ -0,0 +1,80 @@
+"""
+청크 임베딩 영속 캐시 모듈
+- 청크 텍스트의 SHA-256 해시 -> 임베딩 벡터를 SQLite에 저장
+- 인덱스를 다시 만들 때 내용이 바뀌지 않은 청크는 임베딩 모델을 호출하지 않고 재사용
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+# SQLite 바인딩 변수 개수 제한을 넘지 않도록 한 번에 조회할 최대 키 수
+_LOOKUP_CHUNK_SIZE = 500
+
+
+class EmbeddingCache:
+    """청크 텍스트 해시 기반 임베딩 캐시 (SQLite 영속화)"""
+
+    def __init__(self, db_path: str, model_name: str):
+        """
+        Args:
+            db_path: 캐시를 저장할 SQLite 파일 경로
+            model_name: 임베딩 모델 이름 (모델이 바뀌면 다른 캐시 항목으로 취급)
+        """
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embed_cache (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        텍스트별 캐시된 임베딩 조회
+
+        Returns:
+            texts와 같은 순서의 리스트 (캐시에 없으면 None)
+        """
+        hashes = [self._hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_CHUNK_SIZE):
+                chunk = hashes[start:start + _LOOKUP_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, embedding FROM embed_cache "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    (self.model_name, *chunk)
+                ).fetchall()
+                found.update(rows)
+        return [
+            np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+            for h in hashes
+        ]
+
+    def put_many(self, texts: List[str], embeddings: List[List[float]]):
+        """텍스트와 임베딩을 캐시에 저장"""
+        rows = [
+            (self.model_name, self._hash(text), np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embed_cache (model, text_hash, embedding) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
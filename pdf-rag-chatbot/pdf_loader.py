@@ -0,0 +1,11 @@
+"""
+PDF 텍스트 추출 모듈
+- 프로세스 풀 워커가 import하는 모듈이므로 SimpleDirectoryReader만 가져옴
+  (워커마다 torch, sentence-transformers, chromadb를 다시 로드하지 않도록 챗봇 모듈과 분리)
+"""
+from llama_index.core import SimpleDirectoryReader
+
+
+def load_pdf(pdf_file: str):
+    """PDF 한 개를 읽어 Document 리스트로 변환 (프로세스 풀 워커에서 실행)"""
+    return SimpleDirectoryReader(input_files=[pdf_file]).load_data()
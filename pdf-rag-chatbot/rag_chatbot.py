@@ -1,11 +1,20 @@
 """
 LlamaIndex + ChromaDB + OpenAI를 활용한 PDF 기반 RAG 챗봇
 """
+import asyncio
+import gc
+import hashlib
 import os
+import random
+import threading
+import time
 from pathlib import Path
+import httpx
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
+from llama_index.core.schema import MetadataMode
 from llama_index.core.storage.storage_context import StorageContext
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
@@ -14,7 +23,83 @@ import chromadb
 
 # 환경 변수 로드
 load_dotenv()
-\
+
+# 인덱스 생성 시 한 번에 임베딩하여 ChromaDB에 저장할 청크 수
+# (embed_batch_size 100 x 동시 요청 5개 = 한 묶음의 임베딩 요청 5개를 동시에 전송)
+INSERT_BATCH_SIZE = 500
+
+# OpenAI 요청 속도 제한 및 Rate Limit 재시도 설정
+OPENAI_MAX_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE", "3500"))
+OPENAI_RETRY_ATTEMPTS = int(os.getenv("OPENAI_RETRY_ATTEMPTS", "5"))
+OPENAI_RETRY_DELAY = float(os.getenv("OPENAI_RETRY_DELAY", "2"))  # 첫 재시도 최대 대기 시간 (초), 시도마다 2배
+
+
+class _RateLimiter:
+    """분당 요청 수를 제한하는 토큰 버킷 (스레드 안전)"""
+
+    def __init__(self, requests_per_minute: int):
+        self.rate = requests_per_minute / 60.0  # 초당 채워지는 토큰 수
+        self.capacity = max(1.0, self.rate)  # 최대 1초 분량까지 몰아서 요청 허용
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self, count: int) -> float:
+        """토큰이 충분하면 꺼내고 0을, 부족하면 더 기다려야 할 시간(초)을 반환"""
+        count = min(count, self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return 0.0
+            return (count - self.tokens) / self.rate
+
+    def acquire(self, count: int = 1):
+        """요청 count개 분량의 토큰이 찰 때까지 대기"""
+        while (wait_time := self._reserve(count)) > 0:
+            time.sleep(wait_time)
+
+    async def aacquire(self, count: int = 1):
+        """acquire()의 비동기 버전 (이벤트 루프를 막지 않고 대기)"""
+        while (wait_time := self._reserve(count)) > 0:
+            await asyncio.sleep(wait_time)
+
+
+def _is_rate_limit_error(e: Exception) -> bool:
+    error_str = str(e).lower()
+    return "429" in error_str or "rate limit" in error_str or "too many requests" in error_str
+
+
+def _retry_after(e: Exception):
+    """Rate Limit 응답의 Retry-After 헤더 값 (초, 없으면 None)"""
+    response = getattr(e, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_wait(e: Exception, attempt: int) -> float:
+    """
+    Rate Limit 에러 후 재시도 전 대기 시간 (재시도할 수 없는 에러면 예외 발생)
+    - Retry-After 헤더가 있으면 그만큼, 없으면 지수 백오프 + 무작위 지연(jitter)
+    - 여러 요청이 동시에 같은 시점에 재시도하지 않도록 대기 시간을 무작위로 분산
+    """
+    if not _is_rate_limit_error(e):
+        # Rate Limit이 아닌 다른 에러는 즉시 발생
+        raise e
+    if attempt == OPENAI_RETRY_ATTEMPTS - 1:
+        raise Exception("Rate Limit 에러가 계속 발생합니다. 잠시 후 다시 시도해주세요.") from e
+    wait_time = _retry_after(e)
+    if wait_time is None:
+        wait_time = random.uniform(0, OPENAI_RETRY_DELAY * 2 ** attempt)
+    print(f"⚠️  Rate Limit 에러. {wait_time:.1f}초 후 재시도합니다... (시도 {attempt + 1}/{OPENAI_RETRY_ATTEMPTS})")
+    return wait_time
+
+
 class RAGChatbot:
     def __init__(self, pdf_directory: str = "pdfs", persist_dir: str = "./chroma_db"):
         """
@@ -28,20 +113,48 @@ class RAGChatbot:
         if not os.getenv("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY 환경 변수를 설정해주세요.")
         
+        # 모든 OpenAI 호출이 공유하는 요청 속도 제한
+        self.rate_limiter = _RateLimiter(OPENAI_MAX_REQUESTS_PER_MINUTE)
+        
+        # LLM과 Embedding 요청이 함께 쓰는 HTTP/2 연결 풀
+        # (TLS 연결을 재사용하고 한 연결에서 여러 요청을 동시에 전송)
+        self.http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            timeout=httpx.Timeout(120.0)
+        )
+        # 인덱싱의 비동기 배치 임베딩 요청용 HTTP/2 연결 풀 (인덱싱용 이벤트 루프에서만 사용)
+        self.async_http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            timeout=httpx.Timeout(120.0)
+        )
+        
+        # 인덱싱(비동기 배치 임베딩)에 계속 사용하는 이벤트 루프
+        # (임베딩 모델이 재사용하는 비동기 HTTP 클라이언트의 연결은 처음 사용한 루프에 묶이므로
+        #  asyncio.run()처럼 묶음/파일마다 새 루프를 만들고 닫으면 다음 요청이 실패함)
+        self._async_loop = asyncio.new_event_loop()
+        self._async_lock = threading.Lock()
+        
         # LLM 및 Embedding 모델 설정 (Rate Limit 처리 포함)
         self.llm = OpenAI(
             model="gpt-3.5-turbo",
             temperature=0.7,
             api_key=os.getenv("OPENAI_API_KEY"),
             max_retries=10,  # 최대 10번 재시도
-            timeout=120.0  # 타임아웃 120초
+            timeout=120.0,  # 타임아웃 120초
+            http_client=self.http_client
         )
         
         self.embed_model = OpenAIEmbedding(
             model="text-embedding-3-small",
             api_key=os.getenv("OPENAI_API_KEY"),
+            embed_batch_size=100,  # 청크 100개를 한 번의 요청으로 임베딩 (요청 수/왕복 시간 절감)
+            num_workers=5,  # 인덱싱 시 배치 요청을 최대 5개까지 동시에 전송 (Rate Limit 방지용 상한)
             max_retries=10,  # 최대 10번 재시도
-            timeout=120.0  # 타임아웃 120초
+            timeout=120.0,  # 타임아웃 120초
+            http_client=self.http_client,
+            async_http_client=self.async_http_client
         )
         
         # Settings에 LLM과 Embedding 모델 설정
@@ -61,6 +174,19 @@ class RAGChatbot:
         # 벡터 스토어 및 인덱스 초기화
         self.index = None
         self._initialize_index(pdf_directory)
+        
+        # similarity_top_k별 query_engine (query()마다 다시 만들지 않음)
+        self._query_engines: dict = {}
+        
+        # 같은 질문의 답변 캐시 (반복 질문은 임베딩 API 호출과 검색, LLM 호출을 모두 생략)
+        self._query_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+        self._query_cache_lock = threading.Lock()
+    
+    def close(self):
+        """OpenAI HTTP 연결 풀 및 인덱싱용 이벤트 루프 종료"""
+        self.http_client.close()
+        self._async_loop.run_until_complete(self.async_http_client.aclose())
+        self._async_loop.close()
     
     def _initialize_index(self, pdf_directory: str):
         """인덱스 초기화 또는 로드"""
@@ -128,14 +254,6 @@ class RAGChatbot:
         
         print(f"{len(pdf_files)}개의 PDF 파일을 발견했습니다.")
         
-        # PDF 문서 로드
-        documents = SimpleDirectoryReader(
-            input_dir=pdf_directory,
-            required_exts=[".pdf"]
-        ).load_data()
-        
-        print(f"{len(documents)}개의 문서 청크를 로드했습니다.")
-        
         # ChromaDB 벡터 스토어 생성
         chroma_collection = self.chroma_client.get_or_create_collection(
             name=collection_name
@@ -150,30 +268,73 @@ class RAGChatbot:
         print("⚠️  많은 문서가 있으면 시간이 걸릴 수 있습니다.")
         print("⚠️  Rate Limit 에러가 발생하면 자동으로 재시도합니다.")
         
-        max_attempts = 5
-        for attempt in range(max_attempts):
+        # 빈 인덱스에 PDF를 한 파일씩 읽어 추가 (전체 PDF 텍스트를 한꺼번에 메모리에 올리지 않음)
+        self.index = VectorStoreIndex([], storage_context=storage_context)
+        self._run_async(self._aingest_pdf_files(pdf_files))
+        
+        print("✅ 인덱스 생성이 완료되었습니다!")
+    
+    def _call_with_retry(self, func, *args, requests: int = 1):
+        """
+        속도 제한을 지키며 OpenAI 호출 실행 (Rate Limit 에러 시 재시도)
+        
+        Args:
+            func: 실행할 함수
+            requests: 이 호출이 보내는 OpenAI 요청 수 (속도 제한 계산용)
+        """
+        for attempt in range(OPENAI_RETRY_ATTEMPTS):
+            self.rate_limiter.acquire(requests)
             try:
-                self.index = VectorStoreIndex.from_documents(
-                    documents,
-                    storage_context=storage_context,
-                    show_progress=True
-                )
-                print("✅ 인덱스 생성이 완료되었습니다!")
-                break
+                return func(*args)
             except Exception as e:
-                error_str = str(e).lower()
-                if "429" in str(e) or "rate limit" in error_str or "too many requests" in error_str:
-                    if attempt < max_attempts - 1:
-                        wait_time = (attempt + 1) * 30  # 30초, 60초, 90초... 점진적 대기
-                        print(f"\n⚠️  Rate Limit 에러 발생. {wait_time}초 후 재시도합니다... (시도 {attempt + 1}/{max_attempts})")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"\n❌ Rate Limit 에러가 계속 발생합니다.")
-                        print("   몇 분(5-10분) 기다린 후 다시 실행해주세요.")
-                        raise
-                else:
-                    # Rate Limit이 아닌 다른 에러는 즉시 발생
-                    raise
+                time.sleep(_retry_wait(e, attempt))
+    
+    def _run_async(self, coro):
+        """인덱싱용 이벤트 루프에서 코루틴을 끝까지 실행"""
+        with self._async_lock:
+            return self._async_loop.run_until_complete(coro)
+    
+    async def _aingest_pdf_files(self, pdf_files):
+        """PDF를 한 파일씩 읽어 인덱스에 추가 (전체 PDF 텍스트를 한꺼번에 메모리에 올리지 않음)"""
+        for pdf_file in pdf_files:
+            documents = SimpleDirectoryReader(input_files=[str(pdf_file)]).load_data()
+            nodes = Settings.node_parser.get_nodes_from_documents(documents)
+            del documents
+            
+            await self._ainsert_nodes(nodes)
+            print(f"  - {pdf_file.name}: {len(nodes)}개 청크 저장 완료")
+            
+            del nodes
+            gc.collect()
+    
+    async def _ainsert_nodes(self, nodes):
+        """청크를 INSERT_BATCH_SIZE개씩 나누어 임베딩하여 인덱스에 추가"""
+        for start in range(0, len(nodes), INSERT_BATCH_SIZE):
+            await self._ainsert_nodes_with_retry(nodes[start:start + INSERT_BATCH_SIZE])
+    
+    async def _aembed_and_insert_nodes(self, nodes):
+        """
+        청크 묶음의 임베딩을 동시 요청으로 계산한 뒤 인덱스에 추가
+        - insert_nodes()는 임베딩 요청을 하나씩 순서대로 보내므로, 비동기 배치 임베딩으로
+          embed_batch_size개씩 나눈 요청을 num_workers개까지 동시에 보내 node.embedding을 미리 채움
+        - 임베딩이 채워진 청크는 insert_nodes()가 다시 임베딩하지 않고 바로 ChromaDB에 저장
+        """
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        embeddings = await self.embed_model.aget_text_embedding_batch(texts)
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        self.index.insert_nodes(nodes)
+    
+    async def _ainsert_nodes_with_retry(self, nodes):
+        """청크 묶음을 임베딩하여 인덱스에 추가 (속도 제한 준수, Rate Limit 에러 시 재시도)"""
+        batch_size = self.embed_model.embed_batch_size
+        requests = (len(nodes) + batch_size - 1) // batch_size
+        for attempt in range(OPENAI_RETRY_ATTEMPTS):
+            await self.rate_limiter.aacquire(requests)
+            try:
+                return await self._aembed_and_insert_nodes(nodes)
+            except Exception as e:
+                await asyncio.sleep(_retry_wait(e, attempt))
     
     def ingest_pdfs(self, pdf_directory: str):
         """추가 PDF 파일을 인덱스에 추가"""
@@ -188,20 +349,26 @@ class RAGChatbot:
         
         print(f"{len(pdf_files)}개의 PDF 파일을 발견했습니다.")
         
-        # PDF 문서 로드
-        documents = SimpleDirectoryReader(
-            input_dir=pdf_directory,
-            required_exts=[".pdf"]
-        ).load_data()
+        # 기존 인덱스에 한 파일씩 읽어 청크 단위로 추가
+        self._run_async(self._aingest_pdf_files(pdf_files))
         
-        print(f"{len(documents)}개의 문서 청크를 로드했습니다.")
-        
-        # 기존 인덱스에 문서 추가
-        for doc in documents:
-            self.index.insert(doc)
+        # 문서가 바뀌었으므로 캐시된 답변은 더 이상 유효하지 않음
+        with self._query_cache_lock:
+            self._query_cache.clear()
         
         print("문서 추가가 완료되었습니다!")
     
+    def _get_query_engine(self, similarity_top_k: int, streaming: bool = False):
+        """similarity_top_k, 스트리밍 여부에 해당하는 쿼리 엔진 조회 (없으면 한 번만 생성)"""
+        key = (similarity_top_k, streaming)
+        query_engine = self._query_engines.get(key)
+        if query_engine is None:
+            query_engine = self._query_engines.setdefault(
+                key,
+                self.index.as_query_engine(similarity_top_k=similarity_top_k, streaming=streaming)
+            )
+        return query_engine
+    
     def query(self, question: str, similarity_top_k: int = 5):
         """
         질문에 대한 답변 생성
@@ -216,28 +383,52 @@ class RAGChatbot:
         if self.index is None:
             raise ValueError("인덱스가 초기화되지 않았습니다.")
         
-        # 쿼리 엔진 생성
-        query_engine = self.index.as_query_engine(
-            similarity_top_k=similarity_top_k
-        )
+        cache_key = (hashlib.sha1(question.encode("utf-8")).hexdigest(), similarity_top_k)
+        with self._query_cache_lock:
+            answer = self._query_cache.get(cache_key)
+        if answer is not None:
+            return answer
         
-        # 질문 실행 (Rate Limit 자동 재시도)
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                response = query_engine.query(question)
-                return str(response)
-            except Exception as e:
-                error_str = str(e).lower()
-                if "429" in str(e) or "rate limit" in error_str or "too many requests" in error_str:
-                    if attempt < max_attempts - 1:
-                        wait_time = (attempt + 1) * 10  # 10초, 20초 대기
-                        print(f"⚠️  Rate Limit 에러. {wait_time}초 후 재시도합니다...")
-                        time.sleep(wait_time)
-                    else:
-                        raise Exception("Rate Limit 에러가 계속 발생합니다. 잠시 후 다시 시도해주세요.")
-                else:
-                    raise
+        query_engine = self._get_query_engine(similarity_top_k)
+        
+        # 질문 실행 (질문 임베딩 + 답변 생성 요청, Rate Limit 자동 재시도)
+        answer = str(self._call_with_retry(query_engine.query, question, requests=2))
+        with self._query_cache_lock:
+            self._query_cache[cache_key] = answer
+        return answer
+    
+    def stream_query(self, question: str, similarity_top_k: int = 5):
+        """
+        질문에 대한 답변 생성 (토큰 단위 스트리밍)
+        
+        Args:
+            question: 사용자 질문
+            similarity_top_k: 유사한 문서를 몇 개까지 검색할지
+        
+        Yields:
+            답변 토큰 문자열
+        """
+        if self.index is None:
+            raise ValueError("인덱스가 초기화되지 않았습니다.")
+        
+        cache_key = (hashlib.sha1(question.encode("utf-8")).hexdigest(), similarity_top_k)
+        with self._query_cache_lock:
+            answer = self._query_cache.get(cache_key)
+        if answer is not None:
+            yield answer
+            return
+        
+        query_engine = self._get_query_engine(similarity_top_k, streaming=True)
+        
+        # 질문 실행 (Rate Limit 자동 재시도, 토큰 전송이 시작된 뒤에는 재시도하지 않음)
+        response = self._call_with_retry(query_engine.query, question, requests=2)
+        
+        tokens = []
+        for token in response.response_gen:
+            tokens.append(token)
+            yield token
+        with self._query_cache_lock:
+            self._query_cache[cache_key] = "".join(tokens)
     
     def chat(self, question: str, chat_history: list = None):
         """
@@ -260,22 +451,8 @@ class RAGChatbot:
         )
         
         # 질문 실행 (Rate Limit 자동 재시도)
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                response = chat_engine.chat(question)
-                return str(response)
-            except Exception as e:
-                error_str = str(e).lower()
-                if "429" in str(e) or "rate limit" in error_str or "too many requests" in error_str:
-                    if attempt < max_attempts - 1:
-                        wait_time = (attempt + 1) * 10  # 10초, 20초 대기
-                        print(f"⚠️  Rate Limit 에러. {wait_time}초 후 재시도합니다...")
-                        time.sleep(wait_time)
-                    else:
-                        raise Exception("Rate Limit 에러가 계속 발생합니다. 잠시 후 다시 시도해주세요.")
-                else:
-                    raise
+        response = self._call_with_retry(chat_engine.chat, question, requests=2)
+        return str(response)
 
 
 def main():
@@ -296,14 +473,18 @@ def main():
         
         if question.lower() in ['quit', 'exit', 'q', '종료']:
             print("챗봇을 종료합니다.")
+            chatbot.close()
             break
         
         if not question:
             continue
         
         try:
-            answer = chatbot.query(question)
-            print(f"\n답변: {answer}\n")
+            # 답변이 생성되는 대로 출력
+            print("\n답변: ", end="", flush=True)
+            for token in chatbot.stream_query(question):
+                print(token, end="", flush=True)
+            print("\n")
         except Exception as e:
             print(f"오류 발생: {e}\n")
 
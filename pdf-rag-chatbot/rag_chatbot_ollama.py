@@ -1,11 +1,27 @@
 """
 LlamaIndex + ChromaDB + Ollama를 활용한 PDF 기반 RAG 챗봇
 """
+import gc
+import hashlib
+import json
+import mmap
+import multiprocessing
 import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List, Optional
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
+import torch
+
+from llama_index.core import VectorStoreIndex, Settings
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.chat_engine import ContextChatEngine
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.core.storage.storage_context import StorageContext
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.vector_stores.chroma import ChromaVectorStore
@@ -13,9 +29,156 @@ from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.ollama import Ollama
 import chromadb
 
+from embed_cache import EmbeddingCache
+from pdf_loader import load_pdf
+
 # 환경 변수 로드
 load_dotenv()
 
+# 커스텀 시스템 프롬프트 (자세한 답변 유도)
+CUSTOM_SYSTEM_PROMPT = (
+    "당신은 PDF 문서의 내용을 바탕으로 정확하고 자세하게 답변하는 어시스턴트입니다.\n\n"
+    "답변할 때 다음을 반드시 지켜주세요:\n"
+    "1. 제공된 문서의 정보만을 사용하여 답변하세요. 문서에 없는 내용은 추측하지 마세요.\n"
+    "2. 문서에서 찾은 정보를 그대로 인용하거나 요약하여 자세하게 설명하세요.\n"
+    "3. 가능한 한 구체적이고 실용적인 정보를 포함하세요. 예시나 단계별 설명을 포함하세요.\n"
+    "4. 문서에 관련 정보가 정확히 있는 경우, 반드시 그 정보를 바탕으로 답변하세요.\n"
+    "5. 문서에 정보가 없거나 불확실한 경우에만 \"죄송합니다. 해당 정보를 찾을 수 없습니다.\"라고 답변하세요.\n"
+    "6. 답변은 최소 3-5문장 이상으로 자세하게 작성하세요.\n"
+    "7. 문서의 원문을 최대한 존중하여 정확하게 전달하세요."
+)
+
+# 인덱스 생성 시 한 번에 임베딩하여 ChromaDB에 저장할 청크 수
+INSERT_BATCH_SIZE = 256
+
+# PDF를 병렬로 읽는 최대 프로세스 수 (워커마다 파이썬 인터프리터를 새로 띄우므로 작게 유지)
+PDF_LOAD_WORKERS = int(os.getenv("PDF_LOAD_WORKERS", "4"))
+
+
+def _iter_loaded_pdfs(pdf_files: List[Path]):
+    """
+    PDF 파일들을 여러 프로세스에서 병렬로 읽어 순서대로 Document 리스트를 반환
+    - PDF 텍스트 추출(pypdf)은 순수 파이썬이라 GIL 때문에 스레드로는 병렬화되지 않음
+    - 메인 프로세스가 임베딩하는 동안 다음 파일을 미리 읽되, 최대 workers * 2개까지만 앞서 읽음
+    """
+    workers = min(len(pdf_files), PDF_LOAD_WORKERS, os.cpu_count() or 1)
+    if workers <= 1:
+        for pdf_file in pdf_files:
+            yield load_pdf(str(pdf_file))
+        return
+    
+    # 임베딩 모델(torch/CUDA)을 로드한 프로세스를 fork하지 않도록 spawn 사용
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque()
+        for pdf_file in pdf_files:
+            pending.append(executor.submit(load_pdf, str(pdf_file)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _prefetch_files(directory: str):
+    """
+    디렉토리 아래 파일(ChromaDB SQLite/HNSW 세그먼트)을 미리 OS 페이지 캐시로 읽어오도록 요청
+    - 커널이 백그라운드로 읽어들이므로 바로 반환되며, 첫 검색 시 디스크 I/O 대기를 줄임
+    """
+    for path in Path(directory).rglob("*"):
+        if not path.is_file():
+            continue
+        try:
+            if hasattr(os, "posix_fadvise"):
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            elif hasattr(mmap, "MADV_WILLNEED") and path.stat().st_size > 0:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    mm.madvise(mmap.MADV_WILLNEED)
+        except OSError:
+            pass  # 미리 읽기는 최적화일 뿐이므로 실패해도 무시
+
+
+class ChatbotError(Exception):
+    """질문/채팅 처리 실패 (Ollama 연결 오류, 인덱스 미초기화 등)"""
+
+
+class QueryCachedHuggingFaceEmbedding(HuggingFaceEmbedding):
+    """
+    최근 질의 임베딩을 기억하는 HuggingFace 임베딩
+    - API 서버의 시맨틱 캐시 조회와 retriever 검색이 같은 질문을 두 번 임베딩하지 않도록 함
+    - 청크 임베딩은 영속 캐시(EmbeddingCache)에 저장하여 인덱스 재생성 시 재사용
+    """
+    _query_cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _query_cache_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _query_cache_size: int = PrivateAttr(default=256)
+    _text_cache: Optional[EmbeddingCache] = PrivateAttr(default=None)
+
+    def use_text_cache(self, cache: EmbeddingCache):
+        """청크 임베딩 영속 캐시 연결"""
+        self._text_cache = cache
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        if self._text_cache is None:
+            return super()._get_text_embeddings(texts)
+        
+        embeddings = self._text_cache.get_many(texts)
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            computed = super()._get_text_embeddings(miss_texts)
+            self._text_cache.put_many(miss_texts, computed)
+            for i, embedding in zip(misses, computed):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+                return embedding
+        
+        embedding = super()._get_query_embedding(query)
+        
+        with self._query_cache_lock:
+            self._query_cache[query] = embedding
+            if len(self._query_cache) > self._query_cache_size:
+                self._query_cache.popitem(last=False)
+        return embedding
+    
+    def get_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        """
+        여러 질의를 한 번의 모델 호출로 임베딩 (결과는 질의 캐시에도 저장)
+        - ko-sroberta는 질의용 instruction이 없으므로 텍스트 배치 임베딩과 결과가 같음
+        """
+        with self._query_cache_lock:
+            cached = {q: self._query_cache[q] for q in queries if q in self._query_cache}
+        misses = [q for q in dict.fromkeys(queries) if q not in cached]
+        
+        if misses:
+            # 질문은 청크 영속 캐시에 저장하지 않도록 원래 모델 호출을 직접 사용
+            embeddings = super()._get_text_embeddings(misses)
+            with self._query_cache_lock:
+                for query, embedding in zip(misses, embeddings):
+                    self._query_cache[query] = embedding
+                    cached[query] = embedding
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return [cached[q] for q in queries]
+
+
+class _ChatSession:
+    """세션별 chat_engine, 대화 기록 버퍼, 같은 세션의 동시 요청을 직렬화하기 위한 잠금"""
+    __slots__ = ("engine", "memory", "lock")
+
+    def __init__(self, engine: ContextChatEngine, memory: ChatMemoryBuffer):
+        self.engine = engine
+        self.memory = memory
+        self.lock = threading.Lock()
+
+
 class RAGChatbot:
     def __init__(self, pdf_directory: str = "pdfs", persist_dir: str = "./chroma_db", model_name: str = "qwen2.5:1.5b"):
         """
@@ -40,7 +203,10 @@ class RAGChatbot:
                 model=model_name,
                 base_url=ollama_base_url,
                 temperature=0.8,  # 더 창의적이고 자세한 답변을 위해 증가 (0.7 -> 0.8)
-                request_timeout=120.0
+                request_timeout=120.0,
+                # 검색된 청크(최대 12개 x 512토큰)와 대화 기록이 한 번의 프롬프트에 들어가도록 컨텍스트 확장
+                # (기본값 3900이면 Ollama가 프롬프트 앞부분을 잘라내거나 compact 모드가 LLM을 여러 번 호출)
+                context_window=int(os.getenv("OLLAMA_CONTEXT_WINDOW", "16384"))
             )
             print(" Ollama LLM 모델 로드 완료!")
         except Exception as e:
@@ -55,10 +221,31 @@ class RAGChatbot:
         # Embedding 모델 설정 (로컬 Hugging Face 모델 사용 - 무료)
         # 첫 실행 시 모델을 다운로드하므로 시간이 걸릴 수 있습니다
         print("Embedding 모델을 로드하는 중입니다... (첫 실행 시 다운로드가 필요합니다)")
-        self.embed_model = HuggingFaceEmbedding(
+        # GPU가 있으면 자동으로 사용 (EMBED_DEVICE로 강제 지정 가능), GPU에서는 FP16으로 로드
+        embed_device = os.getenv("EMBED_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+        model_kwargs = {"torch_dtype": torch.float16} if embed_device.startswith("cuda") else {}
+        print(f"Embedding 모델 실행 장치: {embed_device}{' (FP16)' if model_kwargs else ''}")
+        # 같은 질문의 임베딩은 캐시하여 재사용 (캐시 조회 + 검색 시 중복 계산 방지)
+        self.embed_model = QueryCachedHuggingFaceEmbedding(
             model_name="jhgan/ko-sroberta-multitask",  # 한국어 지원 embedding 모델
-            device="cpu"  # GPU가 있으면 "cuda"로 변경 가능
+            device=embed_device,
+            embed_batch_size=64,  # 인덱싱 시 청크를 64개씩 묶어 모델에 입력 (기본값 10)
+            trust_remote_code=False,
+            # model_kwargs는 sentence-transformers 3.0 이상에서만 지원하므로 FP16일 때만 전달
+            **({"model_kwargs": model_kwargs} if model_kwargs else {})
         )
+        # 임베딩 값을 결정하는 모델 설정 식별자 (임베딩 캐시 키, ChromaDB 컬렉션 메타데이터에 사용)
+        self.embed_model_id = self.embed_model.model_name + (":fp16" if model_kwargs else "")
+        # CPU에서 EMBED_QUANTIZE=int8이면 Linear 레이어 가중치를 int8로 동적 양자화
+        # (모델 메모리 감소 + int8 행렬곱으로 임베딩 속도 향상, 임베딩 값은 약간 달라짐)
+        if embed_device == "cpu" and os.getenv("EMBED_QUANTIZE", "").lower() == "int8":
+            torch.ao.quantization.quantize_dynamic(
+                self.embed_model._model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+            self.embed_model_id += ":int8"
+            print("Embedding 모델을 int8로 양자화했습니다.")
+        # 첫 질문이 모델/CUDA 지연 초기화 비용을 떠안지 않도록 미리 한 번 실행
+        self.embed_model.get_text_embedding("warmup")
         
         # Settings에 LLM과 Embedding 모델 설정
         Settings.llm = self.llm
@@ -79,132 +266,240 @@ class RAGChatbot:
         # ChromaDB 클라이언트 초기화
         self.persist_dir = persist_dir
         self.chroma_client = chromadb.PersistentClient(path=persist_dir)
+        _prefetch_files(persist_dir)
+        
+        # 청크 임베딩 캐시 (내용이 같은 청크는 인덱스를 다시 만들어도 재임베딩하지 않음)
+        self.embed_model.use_text_cache(EmbeddingCache(
+            db_path=os.path.join(persist_dir, "embed_cache.sqlite3"),
+            model_name=self.embed_model_id
+        ))
         
         # 벡터 스토어 및 인덱스 초기화
         self.index = None
+        self.index_changed = False  # 이번 초기화에서 PDF 추가/변경/삭제가 인덱스에 반영되었는지 여부
         self._initialize_index(pdf_directory)
         
         # 세션별 chat_engine 저장 (대화 기록 유지용)
-        self.chat_engines: dict = {}
-        
-        # 커스텀 시스템 프롬프트 (자세한 답변 유도)
-        self.custom_prompt = (
-            "당신은 PDF 문서의 내용을 바탕으로 정확하고 자세하게 답변하는 어시스턴트입니다.\n\n"
-            "답변할 때 다음을 반드시 지켜주세요:\n"
-            "1. 제공된 문서의 정보만을 사용하여 답변하세요. 문서에 없는 내용은 추측하지 마세요.\n"
-            "2. 문서에서 찾은 정보를 그대로 인용하거나 요약하여 자세하게 설명하세요.\n"
-            "3. 가능한 한 구체적이고 실용적인 정보를 포함하세요. 예시나 단계별 설명을 포함하세요.\n"
-            "4. 문서에 관련 정보가 정확히 있는 경우, 반드시 그 정보를 바탕으로 답변하세요.\n"
-            "5. 문서에 정보가 없거나 불확실한 경우에만 \"죄송합니다. 해당 정보를 찾을 수 없습니다.\"라고 답변하세요.\n"
-            "6. 답변은 최소 3-5문장 이상으로 자세하게 작성하세요.\n"
-            "7. 문서의 원문을 최대한 존중하여 정확하게 전달하세요."
+        # - 최대 세션 수와 TTL을 두어 오래 사용하지 않은 세션의 대화 기록이 메모리에 쌓이지 않도록 함
+        # - 요청이 스레드풀에서 동시에 처리되므로 접근 시 잠금 사용
+        self.chat_engines: TTLCache = TTLCache(
+            maxsize=int(os.getenv("MAX_SESSIONS", "500")),
+            ttl=int(os.getenv("SESSION_TTL", "3600"))
         )
+        self._sessions_lock = threading.Lock()
+        
+        # similarity_top_k별 retriever (서버 시작 시 한 번 생성하여 모든 세션이 공유)
+        self._retrievers: dict = {}
+        self._get_retriever(12)
+        # similarity_top_k별 query_engine (query()마다 프롬프트/retriever/synthesizer를 다시 만들지 않음)
+        self._query_engines: dict = {}
+        
+        # 모든 세션이 공유하는 시스템 프롬프트 메시지 (세션마다 새로 만드는 것은 대화 기록 버퍼뿐)
+        self._chat_prefix_messages = [
+            ChatMessage(role=self.llm.metadata.system_role, content=CUSTOM_SYSTEM_PROMPT)
+        ]
+        self._chat_memory_token_limit = int(os.getenv("CHAT_MEMORY_TOKEN_LIMIT", "3000"))
+        
+        # Ollama에 동시에 보내는 생성 요청 수 제한 (Ollama 서버의 OLLAMA_NUM_PARALLEL과 같게 설정)
+        # - Ollama는 동시에 들어온 요청을 병렬 슬롯에서 함께 배치 처리하므로 슬롯 수만큼은 동시에 보냄
+        # - 슬롯을 넘는 요청은 Ollama 대기열 대신 여기서 기다려, 대기 시간이 request_timeout에 포함되지 않도록 함
+        self._llm_slots = threading.BoundedSemaphore(int(os.getenv("OLLAMA_NUM_PARALLEL", "4")))
     
     def _initialize_index(self, pdf_directory: str):
         """
         벡터 인덱스 초기화 및 DB 저장
-        - 서버 시작 시 pdfs 디렉토리의 모든 PDF를 자동으로 처리
-        - PDF 읽기 → 텍스트 추출 → 청크 분할 → 벡터 변환 → ChromaDB 저장
+        - 서버 시작 시 pdfs 디렉토리의 PDF와 ChromaDB 컬렉션을 동기화
+        - 새로 추가되었거나 내용이 바뀐 PDF만 처리: PDF 읽기 → 텍스트 추출 → 청크 분할 → 벡터 변환 → ChromaDB 저장
         """
         collection_name = "pdf_documents"
         
-        # 기존 컬렉션이 있으면 삭제하고 새로 생성 (항상 최신 PDF 반영)
         try:
-            # 기존 컬렉션 삭제 (항상 최신 PDF 반영을 위해)
+            self._sync_index(pdf_directory, collection_name)
+        except Exception as e:
+            print(f"인덱스 동기화 중 오류 발생: {e}")
+            print("기존 컬렉션을 삭제하고 새 인덱스를 생성합니다...")
+            self.index_changed = True
             try:
                 self.chroma_client.delete_collection(name=collection_name)
-                print(f"기존 ChromaDB 컬렉션 '{collection_name}'를 삭제했습니다.")
             except Exception:
                 pass  # 컬렉션이 없어도 오류 무시
-            
-            # pdfs 디렉토리의 모든 PDF를 처리하여 벡터 인덱스 생성 및 DB 저장
-            print("pdfs 디렉토리의 모든 PDF 파일을 처리하여 벡터 인덱스를 생성하고 ChromaDB에 저장합니다...")
-            self._create_index(pdf_directory, collection_name)
-        except Exception as e:
-            print(f"인덱스 생성 중 오류 발생: {e}")
-            print("새 인덱스를 생성합니다...")
-            self._create_index(pdf_directory, collection_name)
+            self._sync_index(pdf_directory, collection_name)
+    
+    @staticmethod
+    def _file_hash(pdf_file: Path) -> str:
+        """PDF 파일 내용의 해시 (파일이 바뀌었는지 판단하는 기준)"""
+        digest = hashlib.blake2b()
+        with open(pdf_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _manifest_path(self, collection_name: str) -> str:
+        return os.path.join(self.persist_dir, f"{collection_name}_indexed_files.json")
+    
+    def _load_manifest(self, collection_name: str) -> dict:
+        """모든 청크 저장을 마친 PDF 목록 (file_hash -> {"file_name": 파일 이름, "chunks": 청크 수})"""
+        try:
+            with open(self._manifest_path(collection_name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
     
-    def _create_index(self, pdf_directory: str, collection_name: str):
+    def _save_manifest(self, collection_name: str, manifest: dict):
+        """저장 완료 PDF 목록 기록 (임시 파일에 쓴 뒤 교체하여 중간에 종료되어도 파일이 깨지지 않음)"""
+        path = self._manifest_path(collection_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def _sync_index(self, pdf_directory: str, collection_name: str):
         """
-        PDF 파일에서 벡터 인덱스 생성 및 ChromaDB 저장
-        - PDF 읽기 → 텍스트 추출 → 청크 분할 → 벡터 변환 → DB 저장
+        PDF 파일과 ChromaDB 컬렉션을 비교하여 바뀐 부분만 반영
+        - 청크 메타데이터의 file_hash(PDF 내용 해시)로 저장된 파일을 찾고,
+          저장 완료 목록(manifest)에 있는 파일만 다 저장된 것으로 판단
+        - 삭제되었거나 내용이 바뀐 PDF, 저장 도중 중단된 PDF의 청크는 삭제하고 새로 임베딩하여 저장
         """
-        pdf_path = Path(pdf_directory)
+        chroma_collection = self.chroma_client.get_or_create_collection(
+            name=collection_name
+        )
         
-        if not pdf_path.exists():
-            print(f"경고: {pdf_directory} 디렉토리가 존재하지 않습니다.")
-            print("빈 인덱스를 생성합니다.")
-            chroma_collection = self.chroma_client.get_or_create_collection(
-                name=collection_name
+        # 저장된 청크의 file_hash 목록 (file_hash가 없는 청크는 이전 방식으로 만든 컬렉션)
+        existing_hashes = {
+            (metadata or {}).get("file_hash")
+            for metadata in chroma_collection.get(include=["metadatas"])["metadatas"]
+        }
+        # 다른 임베딩 모델 설정(양자화/FP16 여부 포함)으로 만든 벡터는 현재 질문 벡터와 비교할 수 없음
+        stored_model_id = (chroma_collection.metadata or {}).get("embed_model")
+        if existing_hashes and stored_model_id != self.embed_model_id:
+            reason = f"임베딩 모델이 바뀌어({stored_model_id} -> {self.embed_model_id})"
+        elif None in existing_hashes:
+            reason = "파일 해시가 없어"
+        else:
+            reason = None
+        if reason is not None:
+            self.index_changed = True
+            print(f"기존 ChromaDB 컬렉션 '{collection_name}'에 {reason} 새로 생성합니다.")
+            self.chroma_client.delete_collection(name=collection_name)
+            chroma_collection = self.chroma_client.create_collection(
+                name=collection_name,
+                metadata={"embed_model": self.embed_model_id}
             )
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store
-            )
-            self.index = VectorStoreIndex([], storage_context=storage_context)
-            return
+            existing_hashes = set()
+        elif stored_model_id != self.embed_model_id:
+            # 빈 컬렉션은 모델 식별자만 기록
+            chroma_collection.modify(metadata={"embed_model": self.embed_model_id})
         
-        pdf_files = list(pdf_path.glob("*.pdf"))
-        if not pdf_files:
-            print(f"경고: {pdf_directory} 디렉토리에 PDF 파일이 없습니다.")
-            chroma_collection = self.chroma_client.get_or_create_collection(
-                name=collection_name
-            )
-            vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store
-            )
-            self.index = VectorStoreIndex([], storage_context=storage_context)
-            return
+        # 청크가 실제로 있고 마지막 묶음까지 저장을 마친 PDF만 완료로 인정
+        # (텍스트가 없어 청크가 0개인 PDF는 ChromaDB에 흔적이 없으므로 목록만으로 판단)
+        manifest = {
+            file_hash: entry
+            for file_hash, entry in self._load_manifest(collection_name).items()
+            if file_hash in existing_hashes or (isinstance(entry, dict) and entry.get("chunks") == 0)
+        }
         
-        print(f"{len(pdf_files)}개의 PDF 파일을 발견했습니다.")
-        
-        # PDF 문서 로드
-        # SimpleDirectoryReader().load_data()는:
-        # - pdfs 디렉토리의 모든 PDF 파일을 읽음
-        # - 각 PDF 파일을 텍스트로 변환
-        # - Document 객체 리스트를 반환 (각 Document = 하나의 PDF 파일 또는 페이지)
-        # - 아직 청크 분할은 안 됨 (전체 문서 단위)
-        # - 청크 분할은 나중에 VectorStoreIndex.from_documents()에서 수행됨
-        documents = SimpleDirectoryReader(
-            input_dir=pdf_directory,
-            required_exts=[".pdf"]
-        ).load_data()
-        
-        # documents는 Document 객체들의 리스트
-        # 예: [Document(text="PDF1 전체 내용..."), Document(text="PDF2 전체 내용..."), ...]
-        # 각 Document 객체는 다음 속성을 가짐:
-        # - text: PDF에서 추출한 텍스트 내용
-        # - metadata: 파일명, 페이지 번호 등 메타데이터
-        print(f"{len(documents)}개의 문서를 로드했습니다. (PDF 파일 수: {len(pdf_files)})")
-        
-        # ChromaDB 벡터 스토어 생성
-        chroma_collection = self.chroma_client.get_or_create_collection(
-            name=collection_name
-        )
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
         storage_context = StorageContext.from_defaults(
             vector_store=vector_store
         )
+        self.index = VectorStoreIndex([], storage_context=storage_context)
+        
+        pdf_path = Path(pdf_directory)
+        if not pdf_path.exists():
+            print(f"경고: {pdf_directory} 디렉토리가 존재하지 않습니다.")
+            pdf_files = []
+        else:
+            pdf_files = sorted(pdf_path.glob("*.pdf"))
+            if not pdf_files:
+                print(f"경고: {pdf_directory} 디렉토리에 PDF 파일이 없습니다.")
+            else:
+                print(f"{len(pdf_files)}개의 PDF 파일을 발견했습니다.")
+        
+        # 내용이 같은 PDF가 여러 개면 한 번만 저장
+        current_files = {}
+        for pdf_file in pdf_files:
+            current_files.setdefault(self._file_hash(pdf_file), pdf_file)
         
-        # 벡터 인덱스 생성 및 ChromaDB 저장
-        # VectorStoreIndex.from_documents()가 수행하는 작업:
-        # 1. 문서를 청크로 분할 (chunk_size=1024)
-        # 2. 각 청크를 벡터로 변환 (Embedding)
-        # 3. 벡터 인덱스를 생성하고 ChromaDB에 저장
+        # 삭제되었거나 내용이 바뀐 PDF, 저장 도중 중단된 PDF의 청크 삭제
+        stale_hashes = existing_hashes - (current_files.keys() & manifest.keys())
+        if stale_hashes:
+            self.index_changed = True
+            chroma_collection.delete(where={"file_hash": {"$in": list(stale_hashes)}})
+            print(f"변경/삭제되었거나 저장이 끝나지 않은 PDF {len(stale_hashes)}개의 청크를 삭제했습니다.")
+        for file_hash in manifest.keys() - current_files.keys():
+            del manifest[file_hash]
+        self._save_manifest(collection_name, manifest)
+        
+        new_files = [
+            (file_hash, pdf_file)
+            for file_hash, pdf_file in current_files.items()
+            if file_hash not in manifest
+        ]
+        if not new_files:
+            print(" 모든 PDF가 이미 ChromaDB에 저장되어 있습니다.")
+            return
+        self.index_changed = True
+        
+        # 새 PDF를 한 파일씩 처리하여 추가
+        # - 모든 PDF의 텍스트를 한꺼번에 메모리에 올리지 않으므로 PDF가 많아도 메모리 사용량이 일정함
+        # - 파일마다: PDF 읽기 → 청크 분할 → INSERT_BATCH_SIZE개씩 임베딩 생성 + ChromaDB 저장
         # "인덱스"는 빠른 검색을 위한 데이터 구조를 의미합니다
-        print("벡터 인덱스를 생성하고 ChromaDB에 저장하는 중입니다...")
-        print("  (문서 분할 → 임베딩 생성 → DB 저장을 한꺼번에 수행)")
+        print(f"새로 추가되었거나 변경된 PDF {len(new_files)}개를 ChromaDB에 저장하는 중입니다...")
+        print("  (PDF 파일별로 문서 분할 → 임베딩 생성 → DB 저장을 수행)")
         print("  Embedding 모델이 로컬에서 실행되므로 시간이 걸릴 수 있습니다.")
-        self.index = VectorStoreIndex.from_documents(
-            documents,
-            storage_context=storage_context,
-            show_progress=True
-        )
+        
+        # Document 객체 리스트 (PDF 페이지 단위, text + 파일명/페이지 번호 메타데이터)
+        loaded_pdfs = _iter_loaded_pdfs([pdf_file for _, pdf_file in new_files])
+        for (file_hash, pdf_file), documents in zip(new_files, loaded_pdfs):
+            for doc in documents:
+                # 분할된 청크에도 그대로 복사됨 (임베딩/LLM 입력 텍스트에는 포함하지 않음)
+                doc.metadata["file_hash"] = file_hash
+                doc.excluded_embed_metadata_keys.append("file_hash")
+                doc.excluded_llm_metadata_keys.append("file_hash")
+            # 청크(노드)로 분할 (Settings.node_parser = SentenceSplitter)
+            nodes = Settings.node_parser.get_nodes_from_documents(documents)
+            del documents
+            
+            for start in range(0, len(nodes), INSERT_BATCH_SIZE):
+                self.index.insert_nodes(nodes[start:start + INSERT_BATCH_SIZE])
+            # 마지막 묶음까지 저장한 뒤에만 완료로 기록 (중간에 종료되면 다음 시작 시 다시 저장)
+            manifest[file_hash] = {"file_name": pdf_file.name, "chunks": len(nodes)}
+            self._save_manifest(collection_name, manifest)
+            print(f"  - {pdf_file.name}: {len(nodes)}개 청크 저장 완료")
+            
+            # 다음 파일을 읽기 전에 이번 파일의 텍스트/노드 메모리 반환
+            del nodes
+            gc.collect()
         
         print(" 벡터 인덱스 생성 및 DB 저장이 완료되었습니다!")
     
+    def _get_retriever(self, similarity_top_k: int):
+        """similarity_top_k에 해당하는 공유 retriever 반환 (없으면 한 번만 생성)"""
+        retriever = self._retrievers.get(similarity_top_k)
+        if retriever is None:
+            retriever = self._retrievers.setdefault(
+                similarity_top_k,
+                self.index.as_retriever(similarity_top_k=similarity_top_k)
+            )
+        return retriever
+    
+    def _get_query_engine(self, similarity_top_k: int, streaming: bool = False):
+        """similarity_top_k, 스트리밍 여부에 해당하는 공유 query_engine 반환 (없으면 한 번만 생성)"""
+        key = (similarity_top_k, streaming)
+        query_engine = self._query_engines.get(key)
+        if query_engine is None:
+            query_engine = self._query_engines.setdefault(
+                key,
+                self.index.as_query_engine(
+                    similarity_top_k=similarity_top_k,
+                    # 검색된 청크를 한 프롬프트에 채워 넣어 LLM을 한 번만 호출
+                    # (tree_summarize는 청크 묶음마다 요약한 뒤 다시 요약하므로 Ollama를 여러 번 순차 호출)
+                    response_mode="compact",
+                    streaming=streaming
+                )
+            )
+        return query_engine
+    
     def query(self, question: str, similarity_top_k: int = 10):
         """
         질문에 대한 답변 생성
@@ -217,23 +512,97 @@ class RAGChatbot:
             답변 문자열
         """
         if self.index is None:
-            raise ValueError("인덱스가 초기화되지 않았습니다.")
+            raise ChatbotError("인덱스가 초기화되지 않았습니다.")
         
         # 더 많은 컨텍스트를 제공하기 위해 similarity_top_k 증가
-        query_engine = self.index.as_query_engine(
-            similarity_top_k=similarity_top_k,
-            response_mode="tree_summarize"  # compact -> tree_summarize로 변경 (더 나은 요약)
-        )
+        query_engine = self._get_query_engine(similarity_top_k)
         
         print("질문을 처리하는 중입니다...")
         try:
-            response = query_engine.query(question)
+            with self._llm_slots:
+                response = query_engine.query(question)
             return str(response)
         except Exception as e:
             error_msg = f"질문 처리 중 오류 발생: {e}"
             if "connection" in str(e).lower() or "refused" in str(e).lower():
                 error_msg += "\n Ollama 서버가 실행 중인지 확인하세요."
-            raise Exception(error_msg) from e
+            raise ChatbotError(error_msg) from e
+    
+    def stream_query(self, question: str, similarity_top_k: int = 10):
+        """
+        질문에 대한 답변 생성 (토큰 단위 스트리밍)
+        - query()와 같은 방식으로 검색/요약하며, 답변이 생성되는 대로 토큰을 반환합니다.
+        
+        Args:
+            question: 사용자 질문
+            similarity_top_k: 유사한 문서를 몇 개까지 검색할지
+        
+        Yields:
+            답변 토큰 문자열
+        """
+        if self.index is None:
+            raise ChatbotError("인덱스가 초기화되지 않았습니다.")
+        
+        query_engine = self._get_query_engine(similarity_top_k, streaming=True)
+        
+        # 스트리밍이 끝날 때까지 Ollama 슬롯 유지
+        with self._llm_slots:
+            try:
+                response = query_engine.query(question)
+                for token in response.response_gen:
+                    yield token
+            except Exception as e:
+                error_msg = f"질문 처리 중 오류 발생: {e}"
+                if "connection" in str(e).lower() or "refused" in str(e).lower():
+                    error_msg += "\n Ollama 서버가 실행 중인지 확인하세요."
+                raise ChatbotError(error_msg) from e
+    
+    def _get_session(self, session_id: str, similarity_top_k: int) -> _ChatSession:
+        """
+        세션별 chat_engine 조회 (없으면 생성)
+        - 세션별로 chat_engine 재사용 (대화 기록 유지)
+        - retriever와 시스템 프롬프트는 공유하고, 세션마다 대화 기록 버퍼만 새로 생성
+        - 조회와 생성을 하나의 잠금 안에서 처리하여 같은 세션의 엔진이 중복 생성되지 않도록 함
+        """
+        with self._sessions_lock:
+            session = self.chat_engines.get(session_id)
+            if session is None:
+                memory = ChatMemoryBuffer.from_defaults(token_limit=self._chat_memory_token_limit)
+                session = _ChatSession(ContextChatEngine(
+                    retriever=self._get_retriever(similarity_top_k),
+                    llm=self.llm,
+                    memory=memory,
+                    prefix_messages=self._chat_prefix_messages,
+                    callback_manager=Settings.callback_manager
+                ), memory)
+            # 다시 저장하여 TTL 갱신 (마지막 사용 시점 기준으로 만료)
+            self.chat_engines[session_id] = session
+        return session
+    
+    def is_repeated_question(self, question: str, session_id: str = "default") -> bool:
+        """
+        세션의 마지막 사용자 질문과 같은 질문인지 확인
+        - 같은 질문을 같은 세션에 다시 보내는 것은 답변 재생성 요청으로 보고 캐시를 사용하지 않기 위함
+        """
+        with self._sessions_lock:
+            session = self.chat_engines.get(session_id)
+        if session is None:
+            return False
+        with session.lock:
+            for message in reversed(session.memory.get_all()):
+                if message.role == MessageRole.USER:
+                    return message.content == question
+        return False
+    
+    def record_turn(self, question: str, answer: str, session_id: str = "default", similarity_top_k: int = 12):
+        """
+        LLM을 호출하지 않고 응답한 대화(캐시 히트)를 세션 대화 기록에 추가
+        - 사용자가 본 대화와 이후 답변 생성에 쓰이는 대화 기록이 어긋나지 않도록 함
+        """
+        session = self._get_session(session_id, similarity_top_k)
+        with session.lock:
+            session.memory.put(ChatMessage(role=MessageRole.USER, content=question))
+            session.memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
     
     def chat(self, question: str, session_id: str = "default", similarity_top_k: int = 12):
         """
@@ -249,30 +618,52 @@ class RAGChatbot:
             답변 문자열
         """
         if self.index is None:
-            raise ValueError("인덱스가 초기화되지 않았습니다.")
-        
-        # 세션별로 chat_engine 재사용 (대화 기록 유지)
-        # 새로운 세션이거나 similarity_top_k가 변경된 경우 새로 생성
-        if session_id not in self.chat_engines:
-            self.chat_engines[session_id] = self.index.as_chat_engine(
-                chat_mode="context",
-                similarity_top_k=similarity_top_k,
-                verbose=False,
-                system_prompt=self.custom_prompt
-            )
+            raise ChatbotError("인덱스가 초기화되지 않았습니다.")
         
-        chat_engine = self.chat_engines[session_id]
+        session = self._get_session(session_id, similarity_top_k)
         
         # chat_engine.chat()이 내부적으로 retriever를 사용하여 관련 문서를 자동으로 검색하고
         # 답변을 생성
+        # 같은 세션의 동시 요청은 대화 기록이 섞이지 않도록 순서대로 처리 (다른 세션은 병렬 처리)
         try:
-            response = chat_engine.chat(question)
+            with session.lock, self._llm_slots:
+                response = session.engine.chat(question)
             return str(response)
         except Exception as e:
             error_msg = f"채팅 처리 중 오류 발생: {e}"
             if "connection" in str(e).lower() or "refused" in str(e).lower():
                 error_msg += "\n Ollama 서버가 실행 중인지 확인하세요."
-            raise Exception(error_msg) from e
+            raise ChatbotError(error_msg) from e
+    
+    def stream_chat(self, question: str, session_id: str = "default", similarity_top_k: int = 12):
+        """
+        대화형 채팅 (토큰 단위 스트리밍)
+        - chat()과 같은 세션의 대화 기록을 사용하며, 답변이 생성되는 대로 토큰을 반환합니다.
+        
+        Args:
+            question: 사용자 질문
+            session_id: 세션 ID (같은 세션은 대화 기록 공유)
+            similarity_top_k: 유사한 문서를 몇 개까지 검색할지 (기본값 12)
+        
+        Yields:
+            답변 토큰 문자열
+        """
+        if self.index is None:
+            raise ChatbotError("인덱스가 초기화되지 않았습니다.")
+        
+        session = self._get_session(session_id, similarity_top_k)
+        
+        # 스트리밍이 끝날 때까지 세션 잠금과 Ollama 슬롯 유지 (대화 기록은 스트림이 끝난 뒤 저장됨)
+        with session.lock, self._llm_slots:
+            try:
+                response = session.engine.stream_chat(question)
+                for token in response.response_gen:
+                    yield token
+            except Exception as e:
+                error_msg = f"채팅 처리 중 오류 발생: {e}"
+                if "connection" in str(e).lower() or "refused" in str(e).lower():
+                    error_msg += "\n Ollama 서버가 실행 중인지 확인하세요."
+                raise ChatbotError(error_msg) from e
     
     def reset_session(self, session_id: str = "default"):
         """
@@ -281,5 +672,5 @@ class RAGChatbot:
         Args:
             session_id: 초기화할 세션 ID
         """
-        if session_id in self.chat_engines:
-            del self.chat_engines[session_id]
+        with self._sessions_lock:
+            self.chat_engines.pop(session_id, None)
@@ -0,0 +1,226 @@
+"""
+질문 임베딩 기반 시맨틱 응답 캐시 모듈
+- 의미가 비슷한 질문(코사인 유사도 >= threshold)에는 저장된 답변을 재사용
+- 세션 무관 질의 캐시는 similarity_top_k별로 나누어 SQLite에 저장하여 서버 재시작 후에도 유지
+- 세션별 캐시는 세션(대화 기록)과 마찬가지로 메모리에만 보관
+"""
+import itertools
+import sqlite3
+import threading
+from collections import deque
+from typing import Optional, List, Dict, Deque, Tuple, Hashable
+
+import numpy as np
+
+# 파티션 행렬의 최소 행 수 (가득 차면 두 배로 늘림)
+_MIN_CAPACITY = 16
+
+
+class _CachePartition:
+    """같은 세션(또는 같은 similarity_top_k의 세션 무관 질의)의 캐시 항목 묶음"""
+
+    def __init__(self):
+        self.ids: Deque[int] = deque()  # 메모리상 항목 ID
+        self.row_ids: Deque[Optional[int]] = deque()  # SQLite 행 ID (세션 항목은 저장하지 않으므로 None)
+        self.answers: Deque[str] = deque()
+        # 정규화된 질문 벡터 행렬, 유효한 행은 [start, end)
+        # - 추가는 end 위치에 쓰고, 오래된 항목 삭제는 start만 옮겨서 매 추가마다 행렬을 다시 만들지 않음
+        self.matrix: Optional[np.ndarray] = None
+        self.start = 0
+        self.end = 0
+
+    def append(self, entry_id: int, row_id: Optional[int], answer: str, vector: np.ndarray):
+        if self.matrix is None:
+            self.matrix = np.empty((_MIN_CAPACITY, vector.shape[0]), dtype=np.float32)
+        elif self.end == len(self.matrix):
+            # 끝까지 찼으면 유효한 행만 앞으로 모으고, 필요하면 크기를 두 배로 늘림
+            live = self.matrix[self.start:self.end]
+            capacity = max(_MIN_CAPACITY, 2 * len(live))
+            matrix = np.empty((capacity, self.matrix.shape[1]), dtype=np.float32)
+            matrix[:len(live)] = live
+            self.matrix, self.start, self.end = matrix, 0, len(live)
+        self.matrix[self.end] = vector
+        self.end += 1
+        self.ids.append(entry_id)
+        self.row_ids.append(row_id)
+        self.answers.append(answer)
+
+    def pop_oldest(self) -> Optional[int]:
+        """가장 오래된 항목을 삭제하고 SQLite 행 ID를 반환"""
+        self.start += 1
+        self.ids.popleft()
+        self.answers.popleft()
+        return self.row_ids.popleft()
+
+    def vectors(self) -> np.ndarray:
+        return self.matrix[self.start:self.end]
+
+
+class SemanticCache:
+    """질문 임베딩 기반 시맨틱 응답 캐시 (SQLite 영속화)"""
+
+    def __init__(self, db_path: str, threshold: float = 0.92, max_entries: int = 10000):
+        """
+        Args:
+            db_path: 캐시를 저장할 SQLite 파일 경로
+            threshold: 캐시 히트로 판단할 최소 코사인 유사도
+            max_entries: 최대 캐시 항목 수 (초과 시 오래된 항목부터 삭제)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # 메모리상 캐시 잠금 (조회/추가 모두 짧게만 잡음)
+        self._lock = threading.Lock()
+        # SQLite 쓰기 잠금 (디스크 I/O 중에도 조회가 막히지 않도록 메모리 잠금과 분리)
+        self._db_lock = threading.Lock()
+        # 파티션: ("session", session_id) 또는 ("query", similarity_top_k)
+        self._partitions: Dict[Hashable, _CachePartition] = {}
+        # 삽입 순서 (오래된 항목 삭제용, 세션 캐시 삭제로 이미 없어진 항목이 남아 있을 수 있음)
+        self._order: Deque[Tuple[int, Hashable]] = deque()
+        self._entry_ids = itertools.count()
+        self._count = 0  # 현재 캐시 항목 수
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS semantic_query_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                similarity_top_k INTEGER,
+                answer TEXT NOT NULL,
+                embedding BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._load()
+
+    @staticmethod
+    def _partition_key(session_id: Optional[str], similarity_top_k: Optional[int]) -> Hashable:
+        if session_id is not None:
+            return ("session", session_id)
+        return ("query", similarity_top_k)
+
+    def _load(self):
+        """SQLite에 저장된 캐시 항목을 메모리로 로드"""
+        rows = self._conn.execute(
+            "SELECT id, similarity_top_k, answer, embedding FROM semantic_query_cache ORDER BY id"
+        ).fetchall()
+        for row_id, similarity_top_k, answer, embedding in rows:
+            self._append(
+                row_id, ("query", similarity_top_k), answer, np.frombuffer(embedding, dtype=np.float32)
+            )
+        evicted = self._evict_overflow()
+        if evicted:
+            self._conn.executemany(
+                "DELETE FROM semantic_query_cache WHERE id = ?", [(row_id,) for row_id in evicted]
+            )
+            self._conn.commit()
+
+    def _append(self, row_id: Optional[int], key: Hashable, answer: str, vector: np.ndarray):
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = _CachePartition()
+        entry_id = next(self._entry_ids)
+        partition.append(entry_id, row_id, answer, vector)
+        self._order.append((entry_id, key))
+        self._count += 1
+
+    def _evict_overflow(self) -> List[int]:
+        """최대 항목 수를 넘은 만큼 오래된 항목 삭제 (삭제된 항목의 SQLite 행 ID 반환)"""
+        evicted = []
+        while self._count > self.max_entries:
+            entry_id, key = self._order.popleft()
+            partition = self._partitions.get(key)
+            # 파티션 내부도 삽입 순서이므로 가장 오래된 항목은 항상 맨 앞
+            # (맨 앞이 아니면 clear_session으로 이미 삭제된 항목)
+            if partition is None or partition.ids[0] != entry_id:
+                continue
+            row_id = partition.pop_oldest()
+            if not partition.ids:
+                del self._partitions[key]
+            self._count -= 1
+            if row_id is not None:
+                evicted.append(row_id)
+        return evicted
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(
+        self,
+        embedding,
+        session_id: Optional[str] = None,
+        similarity_top_k: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        가장 유사한 질문의 답변 조회
+
+        Args:
+            embedding: 질문 임베딩
+            session_id: 세션 ID (None이면 세션 무관 질의 캐시에서 조회)
+            similarity_top_k: 세션 무관 질의의 검색 문서 수 (같은 값으로 저장된 답변만 조회)
+
+        Returns:
+            유사도가 threshold 이상이면 캐시된 답변, 아니면 None
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            partition = self._partitions.get(self._partition_key(session_id, similarity_top_k))
+            if partition is None:
+                return None
+            scores = partition.vectors() @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return partition.answers[best]
+            return None
+
+    def add(
+        self,
+        embedding,
+        answer: str,
+        session_id: Optional[str] = None,
+        similarity_top_k: Optional[int] = None
+    ):
+        """질문 임베딩과 답변을 캐시에 저장"""
+        vector = self._normalize(embedding)
+        row_id = None
+        if session_id is None:
+            with self._db_lock:
+                cursor = self._conn.execute(
+                    "INSERT INTO semantic_query_cache (similarity_top_k, answer, embedding) VALUES (?, ?, ?)",
+                    (similarity_top_k, answer, vector.tobytes())
+                )
+                self._conn.commit()
+                row_id = cursor.lastrowid
+        with self._lock:
+            self._append(row_id, self._partition_key(session_id, similarity_top_k), answer, vector)
+            evicted = self._evict_overflow()
+        if evicted:
+            with self._db_lock:
+                self._conn.executemany(
+                    "DELETE FROM semantic_query_cache WHERE id = ?", [(row_id,) for row_id in evicted]
+                )
+                self._conn.commit()
+
+    def clear_session(self, session_id: str):
+        """특정 세션의 캐시 삭제 (세션 대화 기록이 초기화된 경우)"""
+        with self._lock:
+            partition = self._partitions.pop(("session", session_id), None)
+            if partition is not None:
+                self._count -= len(partition.ids)
+            # 삭제된 항목이 삽입 순서 목록에 너무 많이 쌓이면 정리
+            if len(self._order) > 2 * max(self._count, self.max_entries):
+                live = {(entry_id, key) for key, p in self._partitions.items() for entry_id in p.ids}
+                self._order = deque(entry for entry in self._order if entry in live)
+
+    def clear(self):
+        """캐시 전체 삭제 (PDF 인덱스가 다시 만들어진 경우 등)"""
+        with self._db_lock:
+            with self._lock:
+                self._partitions.clear()
+                self._order.clear()
+                self._count = 0
+            self._conn.execute("DELETE FROM semantic_query_cache")
+            self._conn.commit()
@@ -0,0 +1,86 @@
+"""
+EmbedBatcher 종료 동작 테스트
+실행: python -m unittest test_embed_batcher
+"""
+import asyncio
+import threading
+import unittest
+
+from embed_batcher import EmbedBatcher
+
+
+class FakeEmbedModel:
+    """질문 길이를 임베딩으로 돌려주는 모델 (release가 설정될 때까지 임베딩을 멈출 수 있음)"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_query_embedding_batch(self, questions):
+        self.calls.append(list(questions))
+        self.release.wait(timeout=5)
+        return [[float(len(q))] for q in questions]
+
+
+class EmbedBatcherStopTest(unittest.IsolatedAsyncioTestCase):
+    async def test_submit_in_flight_during_stop_is_answered(self):
+        model = FakeEmbedModel()
+        batcher = EmbedBatcher(model, max_wait_ms=50)
+        batcher.start()
+
+        pending = asyncio.ensure_future(batcher.submit("abc"))
+        await asyncio.sleep(0)  # 질문이 큐에 들어가도록 양보
+        await asyncio.wait_for(batcher.stop(), timeout=5)
+
+        self.assertEqual(await asyncio.wait_for(pending, timeout=1), [3.0])
+
+    async def test_batch_being_flushed_during_stop_is_answered(self):
+        model = FakeEmbedModel()
+        model.release.clear()
+        batcher = EmbedBatcher(model, max_wait_ms=0)
+        batcher.start()
+
+        first = asyncio.ensure_future(batcher.submit("a"))
+        while not model.calls:  # 첫 배치가 임베딩 중이 될 때까지 대기
+            await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(batcher.submit("bb"))
+        await asyncio.sleep(0)
+
+        stopping = asyncio.ensure_future(batcher.stop())
+        model.release.set()
+        await asyncio.wait_for(stopping, timeout=5)
+
+        self.assertEqual(await asyncio.wait_for(first, timeout=1), [1.0])
+        self.assertEqual(await asyncio.wait_for(second, timeout=1), [2.0])
+
+    async def test_cancelled_batcher_fails_pending_submits(self):
+        model = FakeEmbedModel()
+        model.release.clear()
+        batcher = EmbedBatcher(model, max_wait_ms=0)
+        batcher.start()
+
+        first = asyncio.ensure_future(batcher.submit("a"))
+        while not model.calls:
+            await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(batcher.submit("bb"))
+        await asyncio.sleep(0)
+
+        batcher._task.cancel()
+        model.release.set()
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(first, timeout=1)
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(second, timeout=1)
+
+    async def test_submit_after_stop_is_rejected(self):
+        batcher = EmbedBatcher(FakeEmbedModel())
+        batcher.start()
+        await batcher.stop()
+
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(batcher.submit("a"), timeout=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+RAGChatbot 인덱싱(비동기 배치 임베딩) 테스트
+실행: python -m unittest test_rag_chatbot
+"""
+import asyncio
+import threading
+import unittest
+
+from rag_chatbot import RAGChatbot, INSERT_BATCH_SIZE, _RateLimiter
+
+
+class FakeAsyncEmbedModel:
+    """처음 사용한 이벤트 루프에 묶이는 비동기 임베딩 모델 (OpenAIEmbedding의 재사용 클라이언트와 같은 제약)"""
+
+    embed_batch_size = 100
+
+    def __init__(self):
+        self.loop = None
+        self.calls = 0
+
+    async def aget_text_embedding_batch(self, texts):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("Event loop is closed")
+        self.calls += 1
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+
+class FakeNode:
+    def __init__(self, text):
+        self.text = text
+        self.embedding = None
+
+    def get_content(self, metadata_mode=None):
+        return self.text
+
+
+class FakeIndex:
+    def __init__(self):
+        self.nodes = []
+
+    def insert_nodes(self, nodes):
+        self.nodes.extend(nodes)
+
+
+def make_chatbot():
+    """OpenAI/ChromaDB 연결 없이 인덱싱 경로만 사용하는 챗봇"""
+    chatbot = RAGChatbot.__new__(RAGChatbot)
+    chatbot.rate_limiter = _RateLimiter(10 ** 9)
+    chatbot.embed_model = FakeAsyncEmbedModel()
+    chatbot.index = FakeIndex()
+    chatbot._async_loop = asyncio.new_event_loop()
+    chatbot._async_lock = threading.Lock()
+    return chatbot
+
+
+class IngestEventLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.chatbot = make_chatbot()
+        self.addCleanup(self.chatbot._async_loop.close)
+
+    def test_multiple_batches_are_embedded_and_inserted(self):
+        nodes = [FakeNode("x" * (i % 7 + 1)) for i in range(2 * INSERT_BATCH_SIZE + 1)]
+
+        self.chatbot._run_async(self.chatbot._ainsert_nodes(nodes))
+
+        self.assertEqual(self.chatbot.index.nodes, nodes)
+        self.assertEqual([node.embedding for node in nodes], [[float(len(node.text))] for node in nodes])
+        self.assertEqual(self.chatbot.embed_model.calls, 3)
+
+    def test_later_ingest_reuses_the_same_event_loop(self):
+        first = [FakeNode("a") for _ in range(INSERT_BATCH_SIZE + 1)]
+        second = [FakeNode("bb") for _ in range(INSERT_BATCH_SIZE + 1)]
+
+        self.chatbot._run_async(self.chatbot._ainsert_nodes(first))
+        self.chatbot._run_async(self.chatbot._ainsert_nodes(second))
+
+        self.assertEqual(len(self.chatbot.index.nodes), len(first) + len(second))
+        self.assertTrue(all(node.embedding is not None for node in first + second))
+
+
+if __name__ == "__main__":
+    unittest.main()